@@ -0,0 +1,73 @@
+import crypto from 'crypto';
+import http from 'http';
+import axios from 'axios';
+import dotenv from 'dotenv';
+
+dotenv.config();
+
+// The AI service runs on the same host; prefer its Unix domain socket when configured
+const socketPath = process.env.CV_SERVICE_SOCKET;
+
+// Reuse connections instead of paying connection setup on every request. Idle
+// sockets are dropped before gunicorn's 75 s keep-alive expires, so a request is
+// never sent on a connection the service is about to close.
+const httpAgent = new http.Agent({ keepAlive: true, maxSockets: 16, timeout: 60000 });
+
+const aiService = axios.create({
+  baseURL: socketPath ? 'http://localhost' : (process.env.CV_SERVICE_URL || 'http://localhost:5001'),
+  socketPath: socketPath || undefined,
+  httpAgent
+});
+
+// Send a base64 / data-URL image as raw bytes to /assess-food/raw (no base64 or JSON on the wire)
+const assessRawImage = (image, { fields, reference, timeout } = {}) => {
+  const encoded = image.includes(',') ? image.split(',')[1] : image;
+  const params = {};
+  if (fields) {
+    params.fields = Array.isArray(fields) ? fields.join(',') : fields;
+  }
+  if (reference) {
+    params.reference = reference;
+  }
+  return aiService.post('/assess-food/raw', Buffer.from(encoded, 'base64'), {
+    timeout,
+    params,
+    headers: {
+      'Content-Type': 'application/octet-stream'
+    }
+  });
+};
+
+// Pipe an AI service response stream to the client. If the service drops
+// mid-stream, end the response (after an optional final chunk) rather than
+// leaving it open; if the client goes away, stop reading from the service.
+const relayStream = (upstream, res, finalChunk) => {
+  upstream.on('error', (error) => {
+    console.error('AI service stream failed:', error.message);
+    if (!res.writableEnded) {
+      res.end(finalChunk);
+    }
+  });
+  res.on('close', () => upstream.destroy());
+  upstream.pipe(res);
+};
+
+// Admin endpoints (/profiler) are guarded by FOODCV_ADMIN_TOKEN on the AI service
+const adminHeaders = () => (
+  process.env.CV_SERVICE_ADMIN_TOKEN ? { 'X-Admin-Token': process.env.CV_SERVICE_ADMIN_TOKEN } : {}
+);
+
+// Short-lived ticket that lets a signed-in user open the AI service's frame stream
+// (/stream-frames checks it with the shared FOODCV_STREAM_SECRET)
+const STREAM_TICKET_SECONDS = 60;
+
+const issueStreamTicket = (userId) => {
+  const secret = process.env.CV_SERVICE_STREAM_SECRET;
+  if (!secret) return null;
+  const payload = `${userId}.${Math.floor(Date.now() / 1000) + STREAM_TICKET_SECONDS}`;
+  const signature = crypto.createHmac('sha256', secret).update(payload).digest('hex');
+  return `${payload}.${signature}`;
+};
+
+export { assessRawImage, relayStream, adminHeaders, issueStreamTicket, STREAM_TICKET_SECONDS };
+export default aiService;
@@ -5,7 +5,7 @@ import ErrorResponse from '../config/ErrorResponse.js';
 import { v2 as cloudinary } from 'cloudinary';
 import { sendFoodApprovalNotification, sendVolunteerAssignmentNotification, sendFoodClaimNotification, sendFoodCompletionNotification, sendCollectionStatusNotification } from '../services/notificationService.js';
 import { notifyFoodApproval, notifyVolunteerAssignment, notifyFoodClaim, notifyAssignmentAcceptance, notifyCollectionStatusUpdate } from '../services/socketService.js';
-import axios from 'axios';
+import aiService, { assessRawImage, relayStream, adminHeaders, issueStreamTicket, STREAM_TICKET_SECONDS } from '../config/aiService.js';
 
 // Helper function to extract public_id from Cloudinary URL
 const extractPublicId = (url) => {
@@ -1345,7 +1345,7 @@ export const testAIService = async (req, res, next) => {
   try {
     console.log('Testing AI service...');
     
-    const response = await axios.post('http://localhost:5001/test-prediction', {}, {
+    const response = await aiService.post('/test-prediction', {}, {
       timeout: 30000
     });
     
@@ -1358,7 +1358,7 @@ export const testAIService = async (req, res, next) => {
   } catch (error) {
     console.error('AI service test failed:', error.message);
     
-    if (error.code === 'ECONNREFUSED') {
+    if (['ECONNREFUSED', 'ENOENT'].includes(error.code)) {
       return next(new ErrorResponse('AI service is not running', 503));
     }
     
@@ -1413,12 +1413,16 @@ export const getAssignedFoods = async (req, res, next) => {
 // @access  Private
 export const assessFoodQuality = async (req, res, next) => {
   try {
-    const { image, images } = req.body;
+    const { image, images, fields, foodId } = req.body;
     
     if (!image && !images) {
       return next(new ErrorResponse('Image data is required for assessment', 400));
     }
 
+    // Tag indexed images with their listing (or, before it exists, the donor) so
+    // similar-image matches can be traced back for moderation and dedupe
+    const reference = foodId ? `food:${foodId}` : `user:${req.user.id}`;
+
     // Prepare request data
     const requestData = {};
     if (images) {
@@ -1426,9 +1430,37 @@ export const assessFoodQuality = async (req, res, next) => {
     } else {
       requestData.image = image;
     }
+    // Optional subset of response fields (e.g. listing pages only need a few scores)
+    if (fields) {
+      requestData.fields = fields;
+    }
+    requestData.reference = reference;
+
+    // Streaming mode: relay one NDJSON line per image as the AI service finishes it
+    const wantsStream = req.body.stream === true || req.get('Accept') === 'application/x-ndjson';
+    if (wantsStream) {
+      console.log('Streaming AI food assessment...');
+      const streamResponse = await aiService.post('/assess-food', { ...requestData, stream: true }, {
+        timeout: 45000,
+        responseType: 'stream',
+        headers: {
+          'Content-Type': 'application/json',
+          Accept: 'application/x-ndjson'
+        }
+      });
+
+      res.status(200);
+      res.set('Content-Type', 'application/x-ndjson');
+      relayStream(
+        streamResponse.data,
+        res,
+        JSON.stringify({ success: false, error: 'AI service stream interrupted' }) + '\n'
+      );
+      return;
+    }
 
     console.log('Calling AI service for food assessment...');
-    
+
     // Call Enhanced Python CV service with retry logic
     let response;
     let attempts = 0;
@@ -1436,12 +1468,17 @@ export const assessFoodQuality = async (req, res, next) => {
     
     while (attempts < maxAttempts) {
       try {
-        response = await axios.post('http://localhost:5001/assess-food', requestData, {
-          timeout: 45000, // 45 second timeout for enhanced processing
-          headers: {
-            'Content-Type': 'application/json'
-          }
-        });
+        if (images) {
+          response = await aiService.post('/assess-food', requestData, {
+            timeout: 45000, // 45 second timeout for enhanced processing
+            headers: {
+              'Content-Type': 'application/json'
+            }
+          });
+        } else {
+          // Single images go as raw bytes to skip base64/JSON handling in the AI service
+          response = await assessRawImage(image, { fields, reference, timeout: 45000 });
+        }
         break; // Success, exit retry loop
       } catch (retryError) {
         attempts++;
@@ -1474,7 +1511,7 @@ export const assessFoodQuality = async (req, res, next) => {
     console.error('CV Assessment Error:', error.message);
     
     // Handle different types of errors
-    if (error.code === 'ECONNREFUSED') {
+    if (['ECONNREFUSED', 'ENOENT'].includes(error.code)) {
       return next(new ErrorResponse(
         'AI service is not running. Please start the Enhanced AI service using: npm run start-cv or python scripts/start_ai_service.py', 
         503
@@ -1510,6 +1547,69 @@ export const assessFoodQuality = async (req, res, next) => {
   }
 };
 
+// @desc    Find previously assessed food images similar to an image
+// @route   POST /api/food/ai-similar
+// @access  Private/Volunteer/Admin
+export const findSimilarFoods = async (req, res, next) => {
+  try {
+    const { image, image_hash, k, min_similarity } = req.body;
+
+    if (!image && !image_hash) {
+      return next(new ErrorResponse('Image data or an image hash is required', 400));
+    }
+
+    const response = await aiService.post('/similar', { image, image_hash, k, min_similarity }, {
+      timeout: 30000
+    });
+
+    // Attach the listings that "food:<id>" references point to
+    const referencedFoodId = ({ reference }) => {
+      const id = typeof reference === 'string' && reference.startsWith('food:') ? reference.slice(5) : null;
+      return id && /^[a-f\d]{24}$/i.test(id) ? id : null;
+    };
+    const foodIds = response.data.data.map(referencedFoodId).filter(Boolean);
+    const foods = await Food.find({ _id: { $in: foodIds } }).select('title status donor createdAt');
+    const foodsById = new Map(foods.map((food) => [food._id.toString(), food]));
+
+    res.status(200).json({
+      success: true,
+      data: response.data.data.map((match) => ({
+        ...match,
+        food: foodsById.get(referencedFoodId(match)) || null
+      })),
+      index: response.data.index
+    });
+
+  } catch (error) {
+    console.error('AI similarity search failed:', error.message);
+
+    if (['ECONNREFUSED', 'ENOENT'].includes(error.code)) {
+      return next(new ErrorResponse('AI service is not running', 503));
+    }
+    if (error.response) {
+      return next(new ErrorResponse(error.response.data.error, error.response.status));
+    }
+
+    next(new ErrorResponse('Similarity search failed', 500));
+  }
+};
+
+// @desc    Issue a ticket for opening the AI live frame stream
+// @route   GET /api/food/ai-stream-ticket
+// @access  Private
+export const getAIStreamTicket = async (req, res, next) => {
+  const ticket = issueStreamTicket(req.user.id);
+  if (!ticket) {
+    return next(new ErrorResponse('Live scanning is not configured', 503));
+  }
+
+  res.status(200).json({
+    success: true,
+    ticket,
+    expiresIn: STREAM_TICKET_SECONDS
+  });
+};
+
 // @desc    Check AI service status
 // @route   GET /api/food/ai-status
 // @access  Private
@@ -1517,7 +1617,7 @@ export const checkAIServiceStatus = async (req, res, next) => {
   try {
     console.log('Checking AI service status...');
     
-    const response = await axios.get('http://localhost:5001/health', {
+    const response = await aiService.get('/health', {
       timeout: 10000 // 10 second timeout
     });
     
@@ -1535,7 +1635,7 @@ export const checkAIServiceStatus = async (req, res, next) => {
     let statusMessage = 'AI service is not responding';
     let statusCode = 503;
     
-    if (error.code === 'ECONNREFUSED') {
+    if (['ECONNREFUSED', 'ENOENT'].includes(error.code)) {
       statusMessage = 'AI service is not running. Please start it using: npm run start-cv';
     } else if (error.code === 'ETIMEDOUT') {
       statusMessage = 'AI service is not responding (timeout)';
@@ -1563,7 +1663,7 @@ export const getAIModelsStatus = async (req, res, next) => {
   try {
     console.log('Checking AI models status...');
     
-    const response = await axios.get('http://localhost:5001/models/status', {
+    const response = await aiService.get('/models/status', {
       timeout: 15000 // 15 second timeout
     });
     
@@ -1575,10 +1675,101 @@ export const getAIModelsStatus = async (req, res, next) => {
   } catch (error) {
     console.error('AI models status check failed:', error.message);
     
-    if (error.code === 'ECONNREFUSED') {
+    if (['ECONNREFUSED', 'ENOENT'].includes(error.code)) {
       return next(new ErrorResponse('AI service is not running', 503));
     }
     
     next(new ErrorResponse('Failed to check AI models status', 500));
   }
+};
+
+// @desc    Start profiling a sampled fraction of AI assessments for a time window
+// @route   POST /api/food/ai-profiler
+// @access  Private/Admin
+export const startAIProfiler = async (req, res, next) => {
+  try {
+    const { duration, sample_rate } = req.body;
+    const response = await aiService.post('/profiler', { duration, sample_rate }, {
+      timeout: 10000,
+      headers: adminHeaders()
+    });
+
+    res.status(200).json(response.data);
+  } catch (error) {
+    console.error('AI profiler start failed:', error.message);
+
+    if (['ECONNREFUSED', 'ENOENT'].includes(error.code)) {
+      return next(new ErrorResponse('AI service is not running', 503));
+    }
+    if (error.response) {
+      return next(new ErrorResponse(error.response.data.error, error.response.status));
+    }
+
+    next(new ErrorResponse('Failed to start AI profiler', 500));
+  }
+};
+
+// @desc    Stop the current AI profiling window
+// @route   DELETE /api/food/ai-profiler
+// @access  Private/Admin
+export const stopAIProfiler = async (req, res, next) => {
+  try {
+    const response = await aiService.delete('/profiler', {
+      timeout: 10000,
+      headers: adminHeaders()
+    });
+
+    res.status(200).json(response.data);
+  } catch (error) {
+    console.error('AI profiler stop failed:', error.message);
+
+    if (['ECONNREFUSED', 'ENOENT'].includes(error.code)) {
+      return next(new ErrorResponse('AI service is not running', 503));
+    }
+    if (error.response) {
+      return next(new ErrorResponse(error.response.data.error, error.response.status));
+    }
+
+    next(new ErrorResponse('Failed to stop AI profiler', 500));
+  }
+};
+
+// @desc    Get AI profiler status, or the profile as ?format=text|pstats|collapsed
+// @route   GET /api/food/ai-profiler
+// @access  Private/Admin
+export const getAIProfile = async (req, res, next) => {
+  try {
+    const response = await aiService.get('/profiler', {
+      timeout: 30000,
+      params: req.query,
+      responseType: 'stream',
+      headers: adminHeaders()
+    });
+
+    res.status(200);
+    res.set('Content-Type', response.headers['content-type']);
+    if (response.headers['content-disposition']) {
+      res.set('Content-Disposition', response.headers['content-disposition']);
+    }
+    relayStream(response.data, res);
+  } catch (error) {
+    console.error('AI profile fetch failed:', error.message);
+
+    if (['ECONNREFUSED', 'ENOENT'].includes(error.code)) {
+      return next(new ErrorResponse('AI service is not running', 503));
+    }
+    if (error.response) {
+      // Requested as a stream, so the JSON error body has to be read first
+      let body = '';
+      try {
+        for await (const chunk of error.response.data) body += chunk;
+        body = JSON.parse(body).error;
+      } catch (readError) {
+        body = body || 'Failed to get AI profile';
+      }
+      return next(new ErrorResponse(body, error.response.status));
+    }
+
+    next(new ErrorResponse('Failed to get AI profile', 500));
+  }
 };
\ No newline at end of file
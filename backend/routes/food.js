@@ -25,8 +25,13 @@ import {
   getAvailableVolunteers,
   assessFoodQuality,
   checkAIServiceStatus,
+  getAIStreamTicket,
+  findSimilarFoods,
   getAIModelsStatus,
   testAIService,
+  startAIProfiler,
+  stopAIProfiler,
+  getAIProfile,
   getAssignedFoods
 } from '../controllers/foodController.js';
 
@@ -82,8 +87,13 @@ router.get('/volunteers/available', protect, authorize('admin'), getAvailableVol
 // Enhanced AI food quality assessment
 router.post('/assess-quality', protect, assessFoodQuality);
 router.get('/ai-status', protect, checkAIServiceStatus);
+router.get('/ai-stream-ticket', protect, getAIStreamTicket);
+router.post('/ai-similar', protect, authorizeVolunteerOrAdmin, findSimilarFoods);
 router.get('/ai-models', protect, authorize('admin'), getAIModelsStatus);
 router.post('/test-ai', protect, authorize('admin'), testAIService);
+router.post('/ai-profiler', protect, authorize('admin'), startAIProfiler);
+router.delete('/ai-profiler', protect, authorize('admin'), stopAIProfiler);
+router.get('/ai-profiler', protect, authorize('admin'), getAIProfile);
 
 // Get assigned foods for volunteer
 router.get('/volunteer/assigned-foods', protect, authorizeVolunteerOrAdmin, getAssignedFoods);
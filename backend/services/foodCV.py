@@ -2,11 +2,29 @@
 import cv2
 import numpy as np
 import tensorflow as tf
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+try:
+    from flask_sock import Sock
+except ImportError:  # Live frame streaming is optional
+    Sock = None
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are optional
+    msgpack = None
+import atexit
 import base64
+import binascii
+import cProfile
+import functools
 import io
-from PIL import Image
+import json
+import marshal
+import pstats
+import queue
+import random
+from collections import Counter, OrderedDict, defaultdict, deque
+from PIL import Image, UnidentifiedImageError
 from datetime import datetime
 import logging
 import os
@@ -14,24 +32,763 @@ import requests
 from tensorflow.keras.applications import imagenet_utils
 from sklearn.ensemble import RandomForestClassifier
 import joblib
+import hashlib
+import hmac
+import sqlite3
+import threading
+import time
+from werkzeug.serving import make_server
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
 logging.basicConfig(level=logging.INFO)
 app = Flask(__name__)
 CORS(app)
+sock = Sock(app) if Sock else None
 
 # Create models directory if it doesn't exist
 models_dir = Path('models')
 models_dir.mkdir(exist_ok=True)
 
+# Input resolution expected by each supported backbone
+MODEL_INPUT_SIZES = {
+    'mobilenet': 224,
+    'inception': 299,
+    'efficientnet': 300
+}
+
+# Transport: TCP and/or a Unix domain socket for same-host clients (the Node backend)
+SERVICE_HOST = os.environ.get('FOODCV_HOST', '0.0.0.0')
+SERVICE_PORT = int(os.environ.get('FOODCV_PORT', '5001'))
+SERVICE_TCP_ENABLED = os.environ.get('FOODCV_TCP', '1') != '0'
+SERVICE_UNIX_SOCKET = os.environ.get('FOODCV_UNIX_SOCKET')
+SERVICE_DEBUG = os.environ.get('FOODCV_DEBUG', '1') != '0'
+
+# Run each model once at startup so the first request does not pay graph tracing
+MODEL_PREWARM = os.environ.get('FOODCV_PREWARM', '0' if SERVICE_DEBUG else '1') != '0'
+
+# Confidence-gated cascade: the cheap primary model runs first and the remaining
+# models only run when its food confidence falls inside [low, high)
+CASCADE_ENABLED = os.environ.get('FOODCV_CASCADE', '1') != '0'
+CASCADE_PRIMARY_MODEL = 'mobilenet'
+CASCADE_LOW = float(os.environ.get('FOODCV_CASCADE_LOW', '0.15'))
+CASCADE_HIGH = float(os.environ.get('FOODCV_CASCADE_HIGH', '0.6'))
+
+# Live frame streaming: frames whose thumbnail differs from the last assessed frame by
+# less than this mean absolute difference (0-1) are skipped
+FRAME_DIFF_THRESHOLD = float(os.environ.get('FOODCV_FRAME_DIFF', '0.04'))
+FRAME_SMOOTHING_ALPHA = 0.5
+FRAME_HISTORY = 5
+
+# Browsers open frame streams with a short-lived ticket signed by the Node backend
+STREAM_SECRET = os.environ.get('FOODCV_STREAM_SECRET')
+
+# Each open stream holds a server thread for the whole scan; gunicorn.conf.py adds
+# this many threads on top of FOODCV_THREADS and further streams are refused (1013)
+MAX_FRAME_STREAMS = int(os.environ.get('FOODCV_MAX_STREAMS', '4'))
+
+# Optional persistent assessment store (SQLite), keyed by image hash and model version
+ASSESSMENT_STORE_PATH = os.environ.get('FOODCV_STORE_PATH')
+ASSESSMENT_STORE_MAX_MB = float(os.environ.get('FOODCV_STORE_MAX_MB', '256'))
+ASSESSMENT_STORE_MEMORY_ITEMS = int(os.environ.get('FOODCV_STORE_MEMORY_ITEMS', '2048'))
+MODEL_VERSION = os.environ.get('FOODCV_MODEL_VERSION', '2.0')
+
+# In-memory embedding index of assessed images for /similar lookups
+EMBEDDING_INDEX_ENABLED = os.environ.get('FOODCV_EMBEDDING_INDEX', '1') != '0'
+EMBEDDING_INDEX_MAX_ITEMS = int(os.environ.get('FOODCV_INDEX_MAX_ITEMS', '20000'))
+
+# On-demand profiling of assessments; /profiler is refused unless the admin token is set
+PROFILER_MAX_SECONDS = 600
+ADMIN_TOKEN = os.environ.get('FOODCV_ADMIN_TOKEN')
+
+# Image admission policy, checked from the header before any pixel data is decoded
+MAX_IMAGE_BYTES = int(os.environ.get('FOODCV_MAX_IMAGE_BYTES', str(10 * 1024 * 1024)))
+MAX_IMAGE_DIMENSION = int(os.environ.get('FOODCV_MAX_IMAGE_DIMENSION', '8000'))
+MAX_IMAGE_PIXELS = int(os.environ.get('FOODCV_MAX_IMAGE_PIXELS', str(40_000_000)))
+MIN_IMAGE_DIMENSION = int(os.environ.get('FOODCV_MIN_IMAGE_DIMENSION', '16'))
+DOWNSCALE_IMAGE_PIXELS = int(os.environ.get('FOODCV_DOWNSCALE_PIXELS', str(4_000_000)))
+ALLOWED_IMAGE_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF', 'BMP'}
+HEADER_SNIFF_BYTES = 64 * 1024
+
+# Let Pillow refuse anything beyond our own limit as well
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+# Startup timeline as (phase, seconds); the launcher passes its spawn time so that
+# interpreter start-up and imports are included
+STARTUP_PHASES = []
+startup_mark = time.perf_counter()
+if os.environ.get('FOODCV_LAUNCHED_AT'):
+    STARTUP_PHASES.append(('imports', round(time.time() - float(os.environ['FOODCV_LAUNCHED_AT']), 2)))
+
+def record_startup_phase(phase):
+    """Close the current startup phase and start timing the next one"""
+    global startup_mark
+    now = time.perf_counter()
+    STARTUP_PHASES.append((phase, round(now - startup_mark, 2)))
+    startup_mark = now
+
+def startup_timeline():
+    return {
+        'phases': dict(STARTUP_PHASES),
+        'total_seconds': round(sum(seconds for _, seconds in STARTUP_PHASES), 2)
+    }
+
+# Preprocessing buffer pools shared by concurrent requests (one per request thread)
+BUFFER_POOL_LIMIT = int(os.environ.get('FOODCV_BUFFER_POOLS', int(os.environ.get('FOODCV_THREADS', '8')) + MAX_FRAME_STREAMS))
+
+# Per-channel ImageNet means in BGR order ('caffe' mode of imagenet_utils.preprocess_input)
+IMAGENET_BGR_MEAN = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+class BufferPool:
+    """Reusable input tensors and scratch planes, used by one request at a time"""
+
+    def __init__(self, analysis_size=224):
+        self.analysis_size = analysis_size
+        self.allocations = 0
+        self.inputs = {}
+
+        # Scratch planes for freshness / texture analysis, reused across requests
+        shape = (analysis_size, analysis_size)
+        self.raw = self._allocate(shape + (3,), np.uint8)
+        self.hsv = self._allocate(shape + (3,), np.uint8)
+        self.lab = self._allocate(shape + (3,), np.uint8)
+        self.yuv = self._allocate(shape + (3,), np.uint8)
+        self.gray = self._allocate(shape, np.uint8)
+        self.edges = self._allocate(shape, np.uint8)
+        self.lbp = self._allocate(shape, np.uint8)
+        self.mask = self._allocate(shape, np.bool_)
+
+    def _allocate(self, shape, dtype):
+        self.allocations += 1
+        return np.empty(shape, dtype=dtype)
+
+    def input_slot(self, size):
+        """Return the preallocated (1, size, size, 3) float32 model input for this size"""
+        slot = self.inputs.get(size)
+        if slot is None:
+            slot = self._allocate((1, size, size, 3), np.float32)
+            self.inputs[size] = slot
+        return slot
+
+    def load_input(self, size, rgb):
+        """Normalize an RGB uint8 image into the input slot in place (caffe mode: BGR, mean-centred)"""
+        slot = self.input_slot(size)
+        np.copyto(slot[0], rgb[..., ::-1], casting='unsafe')
+        slot -= IMAGENET_BGR_MEAN
+        return slot
+
+class BufferPools:
+    """Bounded set of BufferPools that requests check out and give back.
+
+    The server may run each request on a fresh thread, so pools are shared
+    rather than thread-owned. At most limit pools are created; once all are in
+    use, a request waits for one to come back.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.pools = []
+        self.idle = queue.LifoQueue()  # most recently used first, while its planes are warm
+        self.checkouts = 0
+        self.lock = threading.Lock()
+        self.current = threading.local()
+
+    @contextmanager
+    def checkout(self):
+        """Hold a pool for the calling thread; nested checkouts reuse it"""
+        pool = getattr(self.current, 'pool', None)
+        if pool is not None:
+            yield pool
+            return
+        
+        pool = self.acquire()
+        self.current.pool = pool
+        try:
+            yield pool
+        finally:
+            self.current.pool = None
+            self.idle.put(pool)
+
+    def acquire(self):
+        try:
+            pool = self.idle.get_nowait()
+        except queue.Empty:
+            pool = None
+            with self.lock:
+                if len(self.pools) < self.limit:
+                    pool = BufferPool()
+                    self.pools.append(pool)
+            if pool is None:
+                pool = self.idle.get()
+        with self.lock:
+            self.checkouts += 1
+        return pool
+
+    def stats(self):
+        with self.lock:
+            return {
+                'pools': len(self.pools),
+                'limit': self.limit,
+                'checkouts': self.checkouts,
+                'allocations': sum(pool.allocations for pool in self.pools)
+            }
+
+buffer_pools = BufferPools(BUFFER_POOL_LIMIT)
+
+def get_buffer_pool():
+    """Buffer pool checked out by the calling thread's request"""
+    pool = getattr(buffer_pools.current, 'pool', None)
+    if pool is None:
+        raise RuntimeError('No buffer pool checked out; wrap the call in buffer_pools.checkout()')
+    return pool
+
+def with_buffer_pool(func):
+    """Run func with a buffer pool checked out for the calling thread"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with buffer_pools.checkout():
+            return func(*args, **kwargs)
+    return wrapper
+
+class ImageRejected(ValueError):
+    """Image refused by the admission policy; reason is a short machine-readable code"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+_image_rejections = Counter()
+_image_rejections_lock = threading.Lock()
+
+def reject_image(reason, message):
+    with _image_rejections_lock:
+        _image_rejections[reason] += 1
+    raise ImageRejected(reason, message)
+
+def image_rejection_counts():
+    with _image_rejections_lock:
+        return dict(_image_rejections)
+
+def check_image_policy(image):
+    """Check format and dimensions of an opened (not yet decoded) PIL image"""
+    if image.format not in ALLOWED_IMAGE_FORMATS:
+        reject_image('unsupported_format', f'Unsupported image format: {image.format}. Use JPEG, PNG or WebP.')
+    
+    width, height = image.size
+    if min(width, height) < MIN_IMAGE_DIMENSION:
+        reject_image('too_small', f'Image too small: {width}x{height} (minimum {MIN_IMAGE_DIMENSION}px per side).')
+    if max(width, height) > MAX_IMAGE_DIMENSION:
+        reject_image('dimensions_too_large', f'Image too large: {width}x{height} exceeds {MAX_IMAGE_DIMENSION}px per side.')
+    if width * height > MAX_IMAGE_PIXELS:
+        reject_image('too_many_pixels', f'Image too large: {width * height / 1e6:.1f} MP exceeds the {MAX_IMAGE_PIXELS / 1e6:.1f} MP limit.')
+
+def read_image_header(image_bytes):
+    """Image.open, with Pillow's decompression-bomb error counted as a policy rejection"""
+    try:
+        return Image.open(io.BytesIO(image_bytes))
+    except Image.DecompressionBombError:
+        reject_image('too_many_pixels', f'Image too large: exceeds the {MAX_IMAGE_PIXELS / 1e6:.1f} MP limit.')
+
+def sniff_image_header(image_data):
+    """Fast pre-validation from payload size and the image header only.
+
+    Only the first HEADER_SNIFF_BYTES are base64-decoded. Raises ImageRejected on a
+    policy violation; images whose header does not fit in the prefix are left to
+    the full check in open_image.
+    """
+    if isinstance(image_data, (bytes, bytearray)):
+        payload_bytes = len(image_data)
+        head = bytes(image_data[:HEADER_SNIFF_BYTES])
+    else:
+        encoded = image_data.split(',', 1)[1] if ',' in image_data else image_data
+        # MIME-wrapped base64 (base64.encodebytes) carries line breaks the decoder skips
+        line_breaks = encoded.count('\n') + encoded.count('\r')
+        payload_bytes = (len(encoded) - line_breaks) * 3 // 4 - encoded.rstrip()[-2:].count('=')
+        
+        window = HEADER_SNIFF_BYTES // 3 * 4
+        prefix = ''.join(encoded[:2 * window].split())
+        if len(prefix) > window:
+            prefix = prefix[:window]
+        elif len(encoded) > 2 * window:
+            prefix = prefix[:len(prefix) // 4 * 4]
+        try:
+            head = base64.b64decode(prefix)
+        except (binascii.Error, ValueError):
+            reject_image('invalid_encoding', 'Image data is not valid base64.')
+    
+    if payload_bytes > MAX_IMAGE_BYTES:
+        reject_image('payload_too_large', f'Image payload of {payload_bytes / 1e6:.1f} MB exceeds the {MAX_IMAGE_BYTES / 1e6:.1f} MB limit.')
+    
+    try:
+        image = read_image_header(head)
+    except UnidentifiedImageError:
+        if payload_bytes <= len(head):
+            reject_image('not_an_image', 'Data is not a recognized image.')
+        return  # Header extends past the sniffed prefix
+    check_image_policy(image)
+
+def open_image(image_bytes, draft_size):
+    """Open and policy-check an image, decoding oversized JPEGs at reduced scale"""
+    try:
+        image = read_image_header(image_bytes)
+    except UnidentifiedImageError:
+        reject_image('not_an_image', 'Data is not a recognized image.')
+    check_image_policy(image)
+    
+    if image.width * image.height > DOWNSCALE_IMAGE_PIXELS:
+        image.draft('RGB', (draft_size, draft_size))  # JPEG only; no-op for other formats
+    return image.convert('RGB')
+
+def decode_image_bytes(image_data):
+    """Raw image bytes from bytes, a base64 string or a data URL"""
+    if isinstance(image_data, (bytes, bytearray)):
+        return bytes(image_data)
+    if ',' in image_data:
+        return base64.b64decode(image_data.split(',')[1])
+    return base64.b64decode(image_data)
+
+def image_content_hash(image_bytes):
+    return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+
+class AssessmentStore:
+    """Assessment results, freshness features and embeddings persisted in SQLite across restarts.
+
+    Recently used entries are also kept in an in-memory LRU, which is warm-loaded
+    from disk at startup. The database is compacted back under max_bytes by
+    evicting the least recently used rows.
+    """
+
+    COMPACT_EVERY = 100  # writes between size checks
+    COMPACT_TARGET = 0.75  # fraction of max_bytes kept after compaction
+    ACCESS_FLUSH_ITEMS = 256  # buffered last_access updates before they are written
+    ACCESS_FLUSH_SECONDS = 30.0
+
+    def __init__(self, path, model_version, max_bytes, memory_items):
+        self.path = Path(path)
+        self.model_version = model_version
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.pending_access = {}
+        self.last_access_flush = time.monotonic()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS assessments (
+                image_hash TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                features BLOB,
+                last_access REAL NOT NULL,
+                embedding BLOB,
+                reference TEXT,
+                PRIMARY KEY (image_hash, model_version)
+            )
+        ''')
+        columns = {row[1] for row in self.db.execute('PRAGMA table_info(assessments)')}
+        for column, column_type in (('embedding', 'BLOB'), ('reference', 'TEXT')):
+            if column not in columns:  # stores created before embeddings were kept
+                self.db.execute(f'ALTER TABLE assessments ADD COLUMN {column} {column_type}')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_assessments_access ON assessments (last_access)')
+        self.db.commit()
+        self.compact()
+        self.warm_load()
+        atexit.register(self.flush_access)
+
+    def warm_load(self):
+        """Fill the in-memory LRU with the most recently used entries for this model version"""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT image_hash, result, features, embedding, reference FROM assessments '
+                'WHERE model_version = ? ORDER BY last_access DESC LIMIT ?',
+                (self.model_version, self.memory_items)
+            ).fetchall()
+            for image_hash, *row in reversed(rows):
+                self.memory[image_hash] = self._decode(*row)
+        print(f"Assessment store warm-loaded {len(rows)} entries from {self.path}")
+
+    def get(self, image_hash):
+        """Cached {'result', 'features', 'embedding', 'reference'} for an image hash, or None.
+
+        Hits only buffer their last_access update; buffered updates are written in
+        one batch once enough accumulate, on the next store write or at exit.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(image_hash)
+            if entry is not None:
+                self.memory.move_to_end(image_hash)
+            else:
+                row = self.db.execute(
+                    'SELECT result, features, embedding, reference FROM assessments '
+                    'WHERE image_hash = ? AND model_version = ?',
+                    (image_hash, self.model_version)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                entry = self._decode(*row)
+                self._remember(image_hash, entry)
+            
+            self.pending_access[image_hash] = now
+            if (len(self.pending_access) >= self.ACCESS_FLUSH_ITEMS
+                    or time.monotonic() - self.last_access_flush >= self.ACCESS_FLUSH_SECONDS):
+                self._write_access()
+                self.db.commit()
+            self.hits += 1
+            return entry
+
+    def put(self, image_hash, result, features=None, embedding=None, reference=None):
+        if features is not None:
+            features = np.asarray(features, dtype=np.float32)
+        if embedding is not None:
+            # Normalize before the float16 cast (as the index does) so small activations don't underflow
+            embedding = normalize_embedding(embedding).astype(np.float16)
+        
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO assessments '
+                '(image_hash, model_version, result, features, last_access, embedding, reference) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    image_hash, self.model_version, json.dumps(result),
+                    None if features is None else features.tobytes(), time.time(),
+                    None if embedding is None else embedding.tobytes(),
+                    None if reference is None else json.dumps(reference)
+                )
+            )
+            self.pending_access.pop(image_hash, None)
+            self._write_access()
+            self.db.commit()
+            self._remember(image_hash, {
+                'result': result,
+                'features': features,
+                'embedding': embedding,
+                'reference': reference
+            })
+            self.writes += 1
+            compact_due = self.writes % self.COMPACT_EVERY == 0
+        
+        if compact_due:
+            self.compact()
+
+    def recent_embeddings(self, limit):
+        """(image_hash, entry) for the most recently used rows that have an embedding"""
+        with self.lock:
+            rows = self.db.execute(
+                'SELECT image_hash, result, features, embedding, reference FROM assessments '
+                'WHERE model_version = ? AND embedding IS NOT NULL ORDER BY last_access DESC LIMIT ?',
+                (self.model_version, limit)
+            ).fetchall()
+        return [(image_hash, self._decode(*row)) for image_hash, *row in rows]
+
+    def flush_access(self):
+        """Write buffered last_access updates"""
+        with self.lock:
+            self._write_access()
+            self.db.commit()
+
+    def _write_access(self):
+        if self.pending_access:
+            self.db.executemany(
+                'UPDATE assessments SET last_access = ? WHERE image_hash = ? AND model_version = ?',
+                [(accessed, image_hash, self.model_version) for image_hash, accessed in self.pending_access.items()]
+            )
+            self.pending_access.clear()
+        self.last_access_flush = time.monotonic()
+
+    def size_bytes(self):
+        page_count = self.db.execute('PRAGMA page_count').fetchone()[0]
+        page_size = self.db.execute('PRAGMA page_size').fetchone()[0]
+        return page_count * page_size
+
+    def compact(self):
+        """Drop other model versions, then evict least recently used rows until under budget"""
+        with self.lock:
+            self._write_access()
+            self.db.execute('DELETE FROM assessments WHERE model_version != ?', (self.model_version,))
+            self.db.commit()
+            size = self.size_bytes()
+            if size <= self.max_bytes:
+                return
+            
+            rows = self.db.execute('SELECT COUNT(*) FROM assessments').fetchone()[0]
+            keep = int(rows * self.COMPACT_TARGET * self.max_bytes / size)
+            self.db.execute(
+                'DELETE FROM assessments WHERE rowid NOT IN '
+                '(SELECT rowid FROM assessments ORDER BY last_access DESC LIMIT ?)',
+                (keep,)
+            )
+            self.db.commit()
+            self.db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.db.execute('VACUUM')
+            print(f"Assessment store compacted: {rows} -> {keep} entries ({size / 1e6:.1f} MB before)")
+
+    def stats(self):
+        with self.lock:
+            entries = self.db.execute('SELECT COUNT(*) FROM assessments').fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'path': str(self.path),
+                'model_version': self.model_version,
+                'entries': entries,
+                'memory_entries': len(self.memory),
+                'size_mb': round(self.size_bytes() / 1e6, 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def _remember(self, image_hash, entry):
+        self.memory[image_hash] = entry
+        self.memory.move_to_end(image_hash)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    @staticmethod
+    def _decode(result, features, embedding=None, reference=None):
+        return {
+            'result': json.loads(result),
+            'features': None if features is None else np.frombuffer(features, dtype=np.float32),
+            'embedding': None if embedding is None else np.frombuffer(embedding, dtype=np.float16),
+            'reference': None if reference is None else json.loads(reference)
+        }
+
+def normalize_embedding(embedding):
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+class EmbeddingIndex:
+    """Unit-normalized float16 embeddings of assessed images with brute-force cosine search.
+
+    Holds at most max_items entries; once full, the oldest entry is overwritten.
+    An image seen again (same content hash) updates its existing row.
+    """
+
+    SEARCH_BLOCK = 8192  # rows upcast to float32 at a time during search
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self.vectors = None
+        self.metadata = []
+        self.rows = {}
+        self.count = 0
+        self.next_evict = 0
+        self.lock = threading.Lock()
+
+    def add(self, image_hash, embedding, metadata):
+        vector = normalize_embedding(embedding)
+        with self.lock:
+            if self.vectors is None:
+                self.vectors = np.empty((min(1024, self.max_items), vector.size), dtype=np.float16)
+            
+            row = self.rows.get(image_hash)
+            if row is None:
+                if self.count < self.max_items:
+                    row = self.count
+                    self.count += 1
+                    self.metadata.append(None)
+                    if row >= len(self.vectors):
+                        grown = np.empty((min(2 * len(self.vectors), self.max_items), vector.size), dtype=np.float16)
+                        grown[:row] = self.vectors[:row]
+                        self.vectors = grown
+                else:
+                    row = self.next_evict
+                    self.next_evict = (row + 1) % self.max_items
+                    del self.rows[self.metadata[row]['image_hash']]
+                self.rows[image_hash] = row
+            
+            self.vectors[row] = vector
+            self.metadata[row] = dict(metadata, image_hash=image_hash)
+
+    def vector(self, image_hash):
+        """Stored embedding for an image hash (float32), or None"""
+        with self.lock:
+            row = self.rows.get(image_hash)
+            return None if row is None else self.vectors[row].astype(np.float32)
+
+    def search(self, query, k=5):
+        """[(cosine similarity, metadata)] for the k nearest stored images"""
+        query = normalize_embedding(query)
+        with self.lock:
+            n = self.count
+            if n == 0 or k <= 0:
+                return []
+            scores = np.empty(n, dtype=np.float32)
+            for start in range(0, n, self.SEARCH_BLOCK):
+                end = min(n, start + self.SEARCH_BLOCK)
+                scores[start:end] = self.vectors[start:end].astype(np.float32) @ query
+            
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), dict(self.metadata[i])) for i in top]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': self.count,
+                'capacity': self.max_items,
+                'dimensions': 0 if self.vectors is None else self.vectors.shape[1],
+                'size_mb': 0.0 if self.vectors is None else round(self.vectors.nbytes / 1e6, 2)
+            }
+
+class SamplingProfiler:
+    """cProfile a sampled fraction of calls for a bounded time window.
+
+    Profiles are merged into one in-memory pstats.Stats. Outside a window the
+    only cost per call is a clock comparison; at most one call is profiled at a
+    time, so sampled calls never contend for the interpreter's profiler hook.
+    """
+
+    def __init__(self):
+        self.deadline = 0.0
+        self.sample_rate = 0.0
+        self.started_at = None
+        self.calls = 0
+        self.sampled = 0
+        self.stats = None
+        self.lock = threading.Lock()
+        self.busy = threading.Lock()
+
+    @property
+    def active(self):
+        return time.monotonic() < self.deadline
+
+    def start(self, duration, sample_rate):
+        """Open a new window, discarding the previous window's results"""
+        with self.lock:
+            self.sample_rate = sample_rate
+            self.started_at = datetime.now().isoformat()
+            self.calls = 0
+            self.sampled = 0
+            self.stats = None
+            self.deadline = time.monotonic() + duration
+        print(f"Profiler started: {sample_rate:.0%} of assessments for {duration:.0f}s")
+
+    def stop(self):
+        self.deadline = 0.0
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if time.monotonic() >= self.deadline:
+                return func(*args, **kwargs)
+            
+            with self.lock:
+                self.calls += 1
+            if random.random() >= self.sample_rate or not self.busy.acquire(blocking=False):
+                return func(*args, **kwargs)
+            
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                self.busy.release()
+                self.record(profile)
+        return wrapper
+
+    def record(self, profile):
+        with self.lock:
+            self.sampled += 1
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+    def status(self):
+        with self.lock:
+            return {
+                'active': self.active,
+                'remaining_seconds': round(max(0.0, self.deadline - time.monotonic()), 1),
+                'sample_rate': self.sample_rate,
+                'started_at': self.started_at,
+                'calls': self.calls,
+                'sampled': self.sampled
+            }
+
+    def report(self, sort='cumulative', limit=40):
+        """Human-readable pstats table"""
+        with self.lock:
+            if self.stats is None:
+                return ''
+            out = io.StringIO()
+            self.stats.stream = out
+            self.stats.sort_stats(sort).print_stats(limit)
+            return out.getvalue()
+
+    def dump(self):
+        """Marshalled stats, loadable with pstats.Stats(path) / snakeviz"""
+        with self.lock:
+            return marshal.dumps(self.stats.stats) if self.stats is not None else b''
+
+    def collapsed(self, min_microseconds=1000):
+        """Collapsed stacks ("a;b;c <microseconds>") for flame graph tools.
+
+        Calls that took less than min_microseconds in total along a path are
+        pruned, which keeps the output small over a long window.
+
+        cProfile records caller/callee edges rather than whole stacks, so each
+        path is reconstructed from the call graph, splitting a function's time
+        between its callers in proportion to the time each one spent in it.
+        """
+        with self.lock:
+            if self.stats is None:
+                return ''
+            entries = dict(self.stats.stats)
+        
+        children = defaultdict(dict)
+        for func, (_, _, _, _, callers) in entries.items():
+            for caller, (_, _, _, cumulative) in callers.items():
+                children[caller][func] = cumulative
+        
+        def label(func):
+            filename, line, name = func
+            return name if filename == '~' else f"{name} ({os.path.basename(filename)}:{line})"
+        
+        samples = Counter()
+        
+        def walk(func, path, seen, elapsed):
+            _, _, own, cumulative, _ = entries[func]
+            share = elapsed / cumulative if cumulative > 0 else 0.0
+            path = f"{path};{label(func)}" if path else label(func)
+            samples[path] += own * share * 1e6
+            for child, child_time in children[func].items():
+                child_elapsed = child_time * share
+                if child not in seen and child_elapsed * 1e6 >= min_microseconds:
+                    walk(child, path, seen | {child}, child_elapsed)
+        
+        for func, (_, _, _, cumulative, callers) in entries.items():
+            if not callers:
+                walk(func, '', {func}, cumulative)
+        
+        return ''.join(f"{path} {round(us)}\n" for path, us in samples.items() if round(us) > 0)
+
+assessment_profiler = SamplingProfiler()
+
 class FoodQualityAI:
     def __init__(self):
         print("Initializing Enhanced Food Quality AI...")
         
         # Load multiple pre-trained models for ensemble prediction
         self.models = {}
+        self.feature_models = {}
         self.load_models()
         
+        # Worker threads for running several models concurrently
+        self.model_executor = ThreadPoolExecutor(
+            max_workers=max(1, len(self.models)), thread_name_prefix='ensemble'
+        )
+        
         # Load or train freshness classifier
         self.freshness_classifier = self.load_freshness_classifier()
         
@@ -78,6 +835,36 @@ class FoodQualityAI:
             'cake': {'base_shelf': 3, 'freshness_factor': 0.9, 'category': 'baked'},
             'cookie': {'base_shelf': 7, 'freshness_factor': 0.6, 'category': 'baked'}
         }
+        
+        # Recommendation text keyed by score band, food group and shelf life
+        self.recommendation_templates = self.build_recommendation_templates()
+        
+        # Persistent assessment store (optional)
+        self.store = self.load_assessment_store()
+        
+        # Embeddings of assessed images for similar-food lookup
+        self.embedding_index = EmbeddingIndex(EMBEDDING_INDEX_MAX_ITEMS) if EMBEDDING_INDEX_ENABLED and self.feature_models else None
+        if self.embedding_index is not None and self.store is not None:
+            self.load_embedding_index()
+    
+    def load_embedding_index(self):
+        """Re-index the embeddings of stored assessments, oldest first so the newest survive eviction"""
+        entries = self.store.recent_embeddings(EMBEDDING_INDEX_MAX_ITEMS)
+        for image_hash, entry in reversed(entries):
+            self.index_assessment(image_hash, entry['embedding'], entry['result'], entry['reference'])
+        print(f"Embedding index loaded {len(entries)} entries from the assessment store")
+    
+    def index_assessment(self, image_hash, embedding, result, reference=None):
+        """Add an assessed image to the similar-food index"""
+        self.embedding_index.add(image_hash, embedding, {
+            'reference': reference,
+            'food_type': result['food_type'],
+            'food_category': result['food_category'],
+            'freshness_score': result['freshness_score'],
+            'quality_grade': result['quality_grade'],
+            'shelf_life_days': result['shelf_life_days'],
+            'assessed_at': result.get('timestamp') or datetime.now().isoformat()
+        })
     
     def load_models(self):
         """Load pre-trained models with error handling"""
@@ -89,11 +876,45 @@ class FoodQualityAI:
             )
             print(f"Successfully loaded {len(self.models)} models")
             
+            # Same network, also exposing the pooled penultimate-layer embedding
+            mobilenet = self.models['mobilenet']
+            self.feature_models['mobilenet'] = tf.keras.Model(
+                inputs=mobilenet.input,
+                outputs=[mobilenet.get_layer('predictions').input, mobilenet.output]
+            )
+            
         except Exception as e:
             print(f"Error loading models: {e}")
             # If even basic model fails, create a dummy model
             self.models = {}
     
+    def prewarm(self):
+        """Run every model once on a blank input to build its predict function"""
+        for model_name, model in self.models.items():
+            size = MODEL_INPUT_SIZES.get(model_name, 224)
+            start = time.perf_counter()
+            self.predict_model(model_name, model, np.zeros((1, size, size, 3), dtype=np.float32))
+            print(f"Prewarmed {model_name} in {time.perf_counter() - start:.2f}s")
+    
+    def model_version(self):
+        """Identifies the models behind stored assessments"""
+        return f"{MODEL_VERSION}:{'+'.join(sorted(self.models))}"
+    
+    def load_assessment_store(self):
+        """Open the persistent assessment store when FOODCV_STORE_PATH is set"""
+        if not ASSESSMENT_STORE_PATH:
+            return None
+        try:
+            return AssessmentStore(
+                ASSESSMENT_STORE_PATH,
+                self.model_version(),
+                max_bytes=int(ASSESSMENT_STORE_MAX_MB * 1024 * 1024),
+                memory_items=ASSESSMENT_STORE_MEMORY_ITEMS
+            )
+        except Exception as e:
+            print(f"Assessment store unavailable: {e}")
+            return None
+    
     def load_freshness_classifier(self):
         """Load or create freshness classification model"""
         classifier_path = models_dir / 'freshness_classifier.joblib'
@@ -123,47 +944,62 @@ class FoodQualityAI:
         return classifier
         
     def preprocess_image(self, image_data):
-        """Enhanced image preprocessing for multiple models"""
+        """Enhanced image preprocessing for multiple models.
+
+        Writes into the request's checked-out BufferPool, so the returned arrays are
+        only valid until the pool is given back.
+        """
         try:
-            # Decode base64 image
-            if ',' in image_data:
-                image_bytes = base64.b64decode(image_data.split(',')[1])
-            else:
-                image_bytes = base64.b64decode(image_data)
-                
-            image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+            pool = get_buffer_pool()
             
-            # Simplified preprocessing for available models
-            processed_images = {}
-            img_224 = image.resize((224, 224))
-            img_array_224 = np.array(img_224)
+            image_bytes = decode_image_bytes(image_data)
+            image = open_image(image_bytes, draft_size=2 * max(MODEL_INPUT_SIZES.values()))
             
-            # Process for available models
+            # Resize once into the shared analysis plane
+            size = pool.analysis_size
+            pool.raw[...] = image.resize((size, size))
+            
+            # Normalize in place into one input slot per resolution; models sharing
+            # a resolution share the same tensor
+            processed_images = {}
+            inputs_by_size = {}
             for model_name in self.models.keys():
-                processed_images[model_name] = np.expand_dims(
-                    tf.keras.applications.imagenet_utils.preprocess_input(img_array_224.copy()), axis=0
-                )
+                input_size = MODEL_INPUT_SIZES.get(model_name, size)
+                if input_size not in inputs_by_size:
+                    if input_size == size:
+                        rgb = pool.raw
+                    else:
+                        rgb = np.asarray(image.resize((input_size, input_size)))
+                    inputs_by_size[input_size] = pool.load_input(input_size, rgb)
+                processed_images[model_name] = inputs_by_size[input_size]
             
             # Return processed images and original for analysis
-            original_array = np.array(image.resize((224, 224)))
-            return processed_images, original_array
+            return processed_images, pool.raw
             
         except Exception as e:
+            if isinstance(e, ImageRejected):
+                raise
             print(f"Image preprocessing error: {e}")
             raise ValueError(f"Failed to process image: {str(e)}")
     
-    def analyze_advanced_freshness(self, image):
-        """Enhanced multi-dimensional freshness analysis"""
+    def analyze_advanced_freshness(self, image, return_features=False):
+        """Enhanced multi-dimensional freshness analysis.
+
+        With return_features, returns (score, 10-dim feature vector or None).
+        """
+        freshness_features = None
         try:
-            # Multi-color space analysis
-            hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
-            lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
-            yuv = cv2.cvtColor(image, cv2.COLOR_RGB2YUV)
+            pool = get_buffer_pool()
             
-            # Color analysis
-            h, s, v = cv2.split(hsv)
-            l, a, b = cv2.split(lab)
-            y, u, v_yuv = cv2.split(yuv)
+            # Multi-color space analysis (written into pooled scratch planes)
+            hsv = cv2.cvtColor(image, cv2.COLOR_RGB2HSV, dst=pool.hsv)
+            lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB, dst=pool.lab)
+            yuv = cv2.cvtColor(image, cv2.COLOR_RGB2YUV, dst=pool.yuv)
+            
+            # Color analysis on channel views instead of split copies
+            h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+            l, a = lab[..., 0], lab[..., 1]
+            u = yuv[..., 1]
             
             # Enhanced freshness indicators
             color_variance = np.std(h) / 180.0
@@ -171,21 +1007,21 @@ class FoodQualityAI:
             brightness_mean = np.mean(v) / 255.0
             
             # Advanced decay detection
-            brown_ratio = np.sum(a > 128) / a.size
-            dark_spots = np.sum(l < 50) / l.size  # Dark spots indicate decay
+            brown_ratio = np.count_nonzero(np.greater(a, 128, out=pool.mask)) / a.size
+            dark_spots = np.count_nonzero(np.less(l, 50, out=pool.mask)) / l.size  # Dark spots indicate decay
             
             # Texture analysis
-            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY, dst=pool.gray)
             
             # Edge sharpness
-            edges = cv2.Canny(gray, 50, 150)
-            edge_density = np.sum(edges > 0) / edges.size
+            edges = cv2.Canny(gray, 50, 150, edges=pool.edges)
+            edge_density = np.count_nonzero(edges) / edges.size
             
             # Texture uniformity (fresh food has more uniform texture)
             texture_variance = np.std(gray) / 255.0
             
             # Local Binary Pattern for texture analysis
-            lbp = self.calculate_lbp(gray)
+            lbp = self.calculate_lbp(gray, out=pool.lbp)
             lbp_uniformity = np.std(lbp) / 255.0
             
             # Color distribution analysis
@@ -206,28 +1042,38 @@ class FoodQualityAI:
                 np.mean(u) / 255.0  # Color balance
             ])
             
+            freshness_score = None
+            
             # Use trained classifier if available
             if hasattr(self, 'freshness_classifier'):
                 try:
-                    freshness_prob = self.freshness_classifier.predict_proba([freshness_features])[0][1]
-                    return float(min(1.0, max(0.0, freshness_prob)))
+                    freshness_score = self.freshness_classifier.predict_proba([freshness_features])[0][1]
                 except:
                     pass
             
             # Fallback to weighted combination
-            weights = [0.15, 0.15, 0.15, 0.1, 0.1, 0.1, 0.1, 0.05, 0.05, 0.05]
-            freshness_score = np.dot(freshness_features, weights)
+            if freshness_score is None:
+                weights = [0.15, 0.15, 0.15, 0.1, 0.1, 0.1, 0.1, 0.05, 0.05, 0.05]
+                freshness_score = np.dot(freshness_features, weights)
             
-            return float(min(1.0, max(0.0, freshness_score)))
+            freshness_score = float(min(1.0, max(0.0, freshness_score)))
             
         except Exception as e:
             print(f"Freshness analysis error: {e}")
-            return 0.5  # Default moderate freshness
+            freshness_score = 0.5  # Default moderate freshness
+        
+        if return_features:
+            return freshness_score, freshness_features
+        return freshness_score
     
-    def calculate_lbp(self, gray, radius=1, n_points=8):
+    def calculate_lbp(self, gray, radius=1, n_points=8, out=None):
         """Calculate Local Binary Pattern for texture analysis"""
         try:
-            lbp = np.zeros_like(gray)
+            if out is None:
+                lbp = np.zeros_like(gray)
+            else:
+                lbp = out
+                lbp.fill(0)
             for i in range(radius, gray.shape[0] - radius):
                 for j in range(radius, gray.shape[1] - radius):
                     center = gray[i, j]
@@ -244,13 +1090,14 @@ class FoodQualityAI:
             return gray  # Fallback to original image
     
     def analyze_texture_quality(self, image):
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY, dst=get_buffer_pool().gray)
         laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
         return float(min(100, laplacian_var / 100))
     
     def estimate_portion_size(self, image):
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
+        pool = get_buffer_pool()
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY, dst=pool.gray)
+        edges = cv2.Canny(gray, 50, 150, edges=pool.edges)
         contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         if contours:
@@ -319,35 +1166,90 @@ class FoodQualityAI:
             
         return False, None
 
-    def ensemble_prediction(self, processed_images):
-        """Enhanced ensemble predictions from multiple models"""
-        predictions = {}
+    def food_confidence(self, predictions):
+        """Highest score among predictions whose label matches a food keyword"""
+        best = 0.0
+        for pred in predictions:
+            class_name, score = pred[-2], float(pred[-1])
+            class_lower = class_name.lower().replace('_', ' ')
+            if any(keyword in class_lower for keyword in self.food_keywords):
+                best = max(best, score)
+        return best
+
+    def predict_model(self, model_name, model, model_input, embeddings=None):
+        """Run one model and return its decoded top-5 predictions (None on failure).
+
+        Models with a feature variant also record their pooled embedding in embeddings.
+        """
+        try:
+            feature_model = self.feature_models.get(model_name)
+            if feature_model is not None:
+                embedding, pred = feature_model.predict(model_input, verbose=0)
+                if embeddings is not None:
+                    embeddings[model_name] = embedding[0]
+            else:
+                pred = model.predict(model_input, verbose=0)
+            
+            # Decode predictions
+            from tensorflow.keras.applications.imagenet_utils import decode_predictions
+            decoded = decode_predictions(pred, top=5)
+            
+            print(f"Model {model_name} predictions: {[p[1] for p in decoded[0][:3]]}")
+            return decoded[0]
+            
+        except Exception as e:
+            print(f"Model {model_name} failed: {e}")
+            return None
+
+    def run_models(self, model_names, processed_images, embeddings=None):
+        """Run the given models, concurrently when there is more than one"""
+        if len(model_names) == 1:
+            name = model_names[0]
+            results = {name: self.predict_model(name, self.models[name], processed_images[name], embeddings)}
+        else:
+            futures = {
+                name: self.model_executor.submit(
+                    self.predict_model, name, self.models[name], processed_images[name], embeddings
+                )
+                for name in model_names
+            }
+            results = {name: future.result() for name, future in futures.items()}
+        return {name: preds for name, preds in results.items() if preds is not None}
+
+    def ensemble_prediction(self, processed_images, cascade=None, embeddings=None):
+        """Enhanced ensemble predictions from multiple models.
+
+        Returns (top_predictions, models_run). In cascade mode the primary model
+        runs alone and the rest are only consulted for uncertain food confidence.
+        Pooled embeddings are collected into embeddings when given.
+        """
+        if cascade is None:
+            cascade = CASCADE_ENABLED
         
-        # Get predictions from each available model
-        for model_name, model in self.models.items():
-            if model_name not in processed_images:
-                continue
-                
-            try:
-                pred = model.predict(processed_images[model_name], verbose=0)
-                
-                # Decode predictions
-                from tensorflow.keras.applications.imagenet_utils import decode_predictions
-                decoded = decode_predictions(pred, top=5)
-                
-                predictions[model_name] = decoded[0]
-                print(f"Model {model_name} predictions: {[p[1] for p in decoded[0][:3]]}")
-                
-            except Exception as e:
-                print(f"Model {model_name} failed: {e}")
-                continue
+        available = [name for name in self.models if name in processed_images]
+        if not available:
+            return [], []
+        
+        if cascade and len(available) > 1 and CASCADE_PRIMARY_MODEL in available:
+            predictions = self.run_models([CASCADE_PRIMARY_MODEL], processed_images, embeddings)
+            primary = predictions.get(CASCADE_PRIMARY_MODEL)
+            confidence = self.food_confidence(primary) if primary is not None else 0.0
+            
+            if primary is None or CASCADE_LOW <= confidence < CASCADE_HIGH:
+                print(f"Cascade escalating (food confidence {confidence:.3f})")
+                remaining = [name for name in available if name != CASCADE_PRIMARY_MODEL]
+                predictions.update(self.run_models(remaining, processed_images, embeddings))
+        else:
+            predictions = self.run_models(available, processed_images, embeddings)
         
         if not predictions:
-            return []
+            return [], []
+        
+        models_run = list(predictions.keys())
         
         # Simple averaging for single model or ensemble
         if len(predictions) == 1:
-            return list(predictions.values())[0]
+            return list(predictions.values())[0], models_run
         
         # Ensemble voting for multiple models
         food_scores = {}
@@ -371,19 +1273,54 @@ class FoodQualityAI:
         
         # Sort by average score
         final_predictions.sort(key=lambda x: float(x[1]), reverse=True)
-        return final_predictions[:5]
+        return final_predictions[:5], models_run
     
-    def assess_food_quality(self, image_data):
-        """Enhanced food quality assessment with improved accuracy"""
+    @assessment_profiler
+    @with_buffer_pool
+    def assess_food_quality(self, image_data, fields=None, index_embedding=True, reference=None, use_store=True):
+        """Enhanced food quality assessment with improved accuracy.
+
+        fields optionally limits the result to those top-level keys; fields that are
+        not requested are not computed unless the result is going to the store, which
+        keeps complete results only. With index_embedding, the image's embedding is
+        added to the similar-food index, tagged with the optional reference. use_store
+        False bypasses the persistent store (e.g. for one-off camera frames).
+        """
+        use_store = use_store and self.store is not None
+        
+        def wanted(name):
+            return fields is None or use_store or name in fields
+        
         try:
             print("Starting food quality assessment...")
             
+            index_embedding = index_embedding and self.embedding_index is not None
+            
+            # Serve repeated images from the persistent store
+            image_hash = None
+            if use_store or index_embedding:
+                image_data = decode_image_bytes(image_data)
+                image_hash = image_content_hash(image_data)
+            if use_store:
+                cached = self.store.get(image_hash)
+                if cached is not None:
+                    print("Assessment served from store")
+                    result = dict(cached['result'])
+                    if index_embedding and cached['embedding'] is not None:
+                        reference = cached['reference'] if reference is None else reference
+                        self.index_assessment(image_hash, cached['embedding'], result, reference)
+                    result['timestamp'] = datetime.now().isoformat()
+                    if fields is not None:
+                        result = {key: value for key, value in result.items() if key in fields}
+                    return result
+            
             # Preprocess image for all models
             processed_images, raw_image = self.preprocess_image(image_data)
             print(f"Image preprocessed for {len(processed_images)} models")
             
             # Get ensemble predictions
-            top_predictions = self.ensemble_prediction(processed_images)
+            embeddings = {}
+            top_predictions, models_run = self.ensemble_prediction(processed_images, embeddings=embeddings)
             
             if not top_predictions:
                 return {'error': 'Analysis failed - no valid predictions from any model'}
@@ -404,9 +1341,9 @@ class FoodQualityAI:
             print(f"Food detected: {food_type} (confidence: {round(float(confidence), 3)})")
             
             # Advanced analysis
-            freshness_ratio = self.analyze_advanced_freshness(raw_image)
+            freshness_ratio, freshness_features = self.analyze_advanced_freshness(raw_image, return_features=True)
             texture_score = self.analyze_texture_quality(raw_image)
-            servings = self.estimate_portion_size(raw_image)
+            servings = self.estimate_portion_size(raw_image) if wanted('estimated_servings') else None
             
             print(f"Analysis scores - Freshness: {round(float(freshness_ratio), 3)}, Texture: {round(float(texture_score), 3)}")
             
@@ -450,18 +1387,7 @@ class FoodQualityAI:
             shelf_life = max(1, min(21, int(float(base_shelf) * (float(freshness_score) / 100) * float(freshness_factor))))
             
             # Enhanced quality grading
-            if freshness_score >= 85:
-                quality_grade = 'Excellent'
-                grade_emoji = '⭐'
-            elif freshness_score >= 70:
-                quality_grade = 'Good'
-                grade_emoji = '✅'
-            elif freshness_score >= 50:
-                quality_grade = 'Fair'
-                grade_emoji = '⚡'
-            else:
-                quality_grade = 'Poor'
-                grade_emoji = '⚠️'
+            quality_grade, grade_emoji = self.grade_freshness(freshness_score)
             
             # Donation suitability with stricter criteria
             donation_suitable = float(freshness_score) >= 60 and int(shelf_life) >= 2
@@ -474,26 +1400,149 @@ class FoodQualityAI:
                 'donation_suitable': donation_suitable,
                 'estimated_servings': servings,
                 'food_type': food_type.replace('_', ' ').title(),
-                'food_category': food_category,
-                'ensemble_predictions': [f"{pred[0].replace('_', ' ').title()} ({pred[1]*100:.1f}%)" for pred in top_predictions[:3]],
-                'recommendations': self.generate_recommendations(freshness_score, shelf_life, food_type, donation_suitable),
-                'analysis_details': {
+                'food_category': food_category
+            }
+            if wanted('ensemble_predictions'):
+                result['ensemble_predictions'] = [f"{pred[0].replace('_', ' ').title()} ({pred[1]*100:.1f}%)" for pred in top_predictions[:3]]
+            if wanted('recommendations'):
+                result['recommendations'] = self.generate_recommendations(freshness_score, shelf_life, food_type, donation_suitable)
+            if wanted('analysis_details'):
+                result['analysis_details'] = {
                     'freshness_ratio': round(float(freshness_ratio), 3),
                     'texture_score': round(float(texture_score), 3),
-                    'models_used': list(processed_images.keys()),
+                    'models_used': models_run,
                     'food_category': food_category
-                },
-                'timestamp': datetime.now().isoformat()
-            }
+                }
+            if wanted('timestamp'):
+                result['timestamp'] = datetime.now().isoformat()
+            
+            # Complete results are stored (and filtered below), so any later field subset can be served
+            embedding = embeddings.get(CASCADE_PRIMARY_MODEL)
+            if use_store:
+                self.store.put(image_hash, result, freshness_features, embedding, reference)
+            
+            if index_embedding and embedding is not None:
+                self.index_assessment(image_hash, embedding, result, reference)
+            
+            if fields is not None:
+                result = {key: value for key, value in result.items() if key in fields}
             
             print(f"Assessment complete: {quality_grade} ({round(float(freshness_score), 1)}%)")
             return result
             
+        except ImageRejected as e:
+            print(f"Image rejected ({e.reason}): {e}")
+            return {'error': str(e)}
         except Exception as e:
             print(f"Assessment error: {str(e)}")
             return {'error': f'Analysis failed: {str(e)}. Please try again with a clearer image.'}
     
+    def grade_freshness(self, freshness_score):
+        """Map a freshness score to (quality_grade, grade_emoji)"""
+        if freshness_score >= 85:
+            return 'Excellent', '⭐'
+        elif freshness_score >= 70:
+            return 'Good', '✅'
+        elif freshness_score >= 50:
+            return 'Fair', '⚡'
+        return 'Poor', '⚠️'
+    
+    # Representative food type for each storage-advice group in build_recommendations
+    RECOMMENDATION_GROUPS = {
+        'banana': 'banana',
+        'fruit': 'apple',
+        'vegetable': 'lettuce',
+        'baked': 'bread',
+        'protein': 'meat',
+        'prepared': 'pizza',
+        'other': ''
+    }
+    
+    # Representative score for each band of build_recommendations' score thresholds
+    RECOMMENDATION_SCORE_BANDS = [(85, 90), (70, 75), (60, 65), (50, 55), (0, 30)]
+    
+    MAX_SHELF_LIFE = 21
+    
+    def recommendation_group(self, food_type):
+        """Storage-advice group for a food type (same keyword order as build_recommendations)"""
+        food_lower = food_type.lower()
+        if any(x in food_lower for x in ['fruit', 'apple', 'banana', 'berry', 'grape', 'orange']):
+            return 'banana' if 'banana' in food_lower else 'fruit'
+        elif any(x in food_lower for x in ['vegetable', 'salad', 'lettuce', 'broccoli', 'carrot']):
+            return 'vegetable'
+        elif any(x in food_lower for x in ['bread', 'cake', 'pastry', 'cookie']):
+            return 'baked'
+        elif any(x in food_lower for x in ['meat', 'fish', 'chicken', 'beef']):
+            return 'protein'
+        elif any(x in food_lower for x in ['pizza', 'sandwich', 'pasta', 'rice']):
+            return 'prepared'
+        return 'other'
+    
+    def recommendation_band(self, freshness_score):
+        for lower, _ in self.RECOMMENDATION_SCORE_BANDS:
+            if freshness_score >= lower:
+                return lower
+        return 0
+    
+    def build_recommendation_templates(self):
+        """Precompute recommendation lists keyed by (score band, group, shelf life, donation)"""
+        templates = {}
+        for band, score in self.RECOMMENDATION_SCORE_BANDS:
+            for group, food_type in self.RECOMMENDATION_GROUPS.items():
+                for shelf_life in range(1, self.MAX_SHELF_LIFE + 1):
+                    for donation_suitable in (True, False):
+                        templates[(band, group, shelf_life, donation_suitable)] = tuple(
+                            self.build_recommendations(score, shelf_life, food_type, donation_suitable)
+                        )
+        return templates
+    
+    @with_buffer_pool
+    def embed_image(self, image_data):
+        """Pooled embedding of an image (one forward pass, nothing is indexed)"""
+        model_name = CASCADE_PRIMARY_MODEL
+        feature_model = self.feature_models.get(model_name)
+        if feature_model is None:
+            raise ValueError('No embedding model available')
+        processed_images, _ = self.preprocess_image(image_data)
+        embedding, _ = feature_model.predict(processed_images[model_name], verbose=0)
+        return embedding[0]
+    
+    def find_similar(self, image_data=None, image_hash=None, k=5):
+        """Nearest previously assessed images, by image or by stored image hash"""
+        if image_data is not None:
+            image_data = decode_image_bytes(image_data)
+            image_hash = image_content_hash(image_data)
+        
+        # Already-indexed images are looked up without re-running the network
+        query = self.embedding_index.vector(image_hash) if image_hash else None
+        if query is None:
+            if image_data is None:
+                raise LookupError(f'Unknown image hash: {image_hash}')
+            query = self.embed_image(image_data)
+        
+        return [
+            dict(metadata, similarity=round(score, 4), exact_match=metadata['image_hash'] == image_hash)
+            for score, metadata in self.embedding_index.search(query, k)
+        ]
+    
     def generate_recommendations(self, freshness_score, shelf_life, food_type="", donation_suitable=True):
+        """Recommendations from the precomputed templates, built directly if out of range"""
+        templates = getattr(self, 'recommendation_templates', None)
+        if templates is None:
+            templates = self.recommendation_templates = self.build_recommendation_templates()
+        
+        key = (
+            self.recommendation_band(freshness_score),
+            self.recommendation_group(food_type),
+            shelf_life,
+            bool(donation_suitable)
+        )
+        template = templates.get(key)
+        if template is None:
+            return self.build_recommendations(freshness_score, shelf_life, food_type, donation_suitable)
+        return list(template)
+    
+    def build_recommendations(self, freshness_score, shelf_life, food_type="", donation_suitable=True):
         """Generate enhanced recommendations based on analysis"""
         recommendations = []
         
@@ -552,17 +1601,193 @@ class FoodQualityAI:
         
         return recommendations
 
+def frame_signature(image_bytes, size=16):
+    """Tiny grayscale thumbnail used to detect frames that barely changed"""
+    image = read_image_header(image_bytes)
+    check_image_policy(image)
+    image.draft('L', (size * 4, size * 4))  # JPEG: decode at reduced scale
+    thumb = image.convert('L').resize((size, size))
+    return np.asarray(thumb, dtype=np.float32) / 255.0
+
+def verify_stream_ticket(ticket):
+    """Check a "<user id>.<expiry>.<signature>" ticket issued by the Node backend"""
+    if not STREAM_SECRET or not ticket:
+        return False
+    try:
+        user_id, expires, signature = ticket.rsplit('.', 2)
+        expires_at = int(expires)
+    except ValueError:
+        return False
+    expected = hmac.new(STREAM_SECRET.encode(), f'{user_id}.{expires}'.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected) and expires_at >= time.time()
+
+class FrameStream:
+    """Per-connection state for live camera scanning: change detection and smoothing"""
+
+    def __init__(self, ai, threshold=FRAME_DIFF_THRESHOLD, alpha=FRAME_SMOOTHING_ALPHA):
+        self.ai = ai
+        self.threshold = threshold
+        self.alpha = alpha
+        self.frames = 0
+        self.assessed = 0
+        self.last_signature = None
+        self.smoothed = None
+        self.food_types = deque(maxlen=FRAME_HISTORY)
+
+    def process(self, frame):
+        """Handle one frame (JPEG bytes or base64 string) and return the message to push"""
+        self.frames += 1
+        
+        try:
+            sniff_image_header(frame)  # payload size and header, before decoding
+        except ImageRejected as e:
+            return {'type': 'error', 'frame': self.frames, 'error': str(e), 'reason': e.reason}
+        
+        if isinstance(frame, str):
+            encoded = frame.split(',')[1] if ',' in frame else frame
+            try:
+                frame = base64.b64decode(encoded)
+            except (binascii.Error, ValueError):
+                return {'type': 'error', 'frame': self.frames, 'error': 'Frame is not valid base64'}
+        
+        if not frame or len(frame) < 100:
+            return {'type': 'error', 'frame': self.frames, 'error': 'Invalid frame data provided'}
+        
+        try:
+            signature = frame_signature(frame)
+        except Exception as e:
+            return {'type': 'error', 'frame': self.frames, 'error': f'Failed to read frame: {str(e)}'}
+        
+        if self.last_signature is not None and signature.shape == self.last_signature.shape:
+            difference = float(np.mean(np.abs(signature - self.last_signature)))
+            if difference < self.threshold:
+                return {'type': 'skipped', 'frame': self.frames, 'difference': round(difference, 4)}
+        
+        self.last_signature = signature
+        self.assessed += 1
+        result = self.ai.assess_food_quality(frame, index_embedding=False, use_store=False)
+        
+        if 'error' in result:
+            return {'type': 'error', 'frame': self.frames, 'error': result['error']}
+        
+        return {
+            'type': 'assessment',
+            'frame': self.frames,
+            'frames_assessed': self.assessed,
+            'data': self.smooth(result),
+            'latest': result
+        }
+
+    def smooth(self, result):
+        """Exponential moving average of the scores, majority vote on food type"""
+        if self.smoothed is None:
+            self.smoothed = {
+                'freshness_score': float(result['freshness_score']),
+                'confidence': float(result['confidence']),
+                'shelf_life_days': float(result['shelf_life_days'])
+            }
+        else:
+            for key in self.smoothed:
+                self.smoothed[key] += self.alpha * (float(result[key]) - self.smoothed[key])
+        
+        self.food_types.append(result['food_type'])
+        freshness_score = self.smoothed['freshness_score']
+        shelf_life = max(1, int(round(self.smoothed['shelf_life_days'])))
+        quality_grade, grade_emoji = self.ai.grade_freshness(freshness_score)
+        
+        return {
+            'freshness_score': round(freshness_score, 1),
+            'quality_grade': f'{grade_emoji} {quality_grade}',
+            'shelf_life_days': shelf_life,
+            'confidence': round(self.smoothed['confidence'], 1),
+            'donation_suitable': freshness_score >= 60 and shelf_life >= 2,
+            'food_type': Counter(self.food_types).most_common(1)[0][0],
+            'timestamp': datetime.now().isoformat()
+        }
+
 # Initialize the enhanced AI system
 print("Initializing Enhanced Food Quality AI System...")
 food_ai = FoodQualityAI()
+record_startup_phase('models')
+if MODEL_PREWARM:
+    food_ai.prewarm()
+    record_startup_phase('prewarm')
 print("AI System ready!")
 
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+def requested_fields(data):
+    """Optional response field subset from {"fields": [...]} or ?fields=a,b
+
+    Raises ValueError unless fields is a comma-separated string or a list of strings.
+    """
+    fields = data.get('fields') or request.args.get('fields')
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields):
+        raise ValueError('fields must be a list of field names or a comma-separated string.')
+    return {field.strip() for field in fields if field and field.strip()}
+
+def wants_msgpack(data):
+    if data.get('format') == 'msgpack':
+        return True
+    return request.accept_mimetypes.best in MSGPACK_MIMETYPES
+
+def encode_response(payload, status=200, use_msgpack=False):
+    """JSON by default, MessagePack when the client asked for it"""
+    if use_msgpack:
+        return Response(msgpack.packb(payload, use_bin_type=True), status=status, mimetype='application/msgpack')
+    return jsonify(payload), status
+
+def assess_single_image(image, fields=None, reference=None):
+    """Validate and assess one image from an /assess-food request"""
+    if not image or len(image) < 100:  # Basic validation
+        return {'error': 'Invalid image data provided'}
+    try:
+        sniff_image_header(image)
+    except ImageRejected as e:
+        return {'error': str(e)}
+    return food_ai.assess_food_quality(image, fields=fields, reference=reference)
+
+def wants_ndjson(data):
+    """Streaming is opt-in via {"stream": true} or an application/x-ndjson Accept header"""
+    if data.get('stream') is True:
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+def stream_assessments(images, fields=None, reference=None):
+    """Yield one NDJSON line per image as soon as it is assessed, then a summary line"""
+    successful = 0
+    for i, image in enumerate(images):
+        print(f"Streaming image {i+1}/{len(images)}")
+        try:
+            result = assess_single_image(image, fields, reference)
+        except Exception as e:
+            result = {'error': f'Analysis failed: {str(e)}'}
+        
+        if 'error' in result:
+            line = {'index': i, 'success': False, 'error': result['error']}
+        else:
+            successful += 1
+            line = {'index': i, 'success': True, 'data': result}
+        yield json.dumps(line) + '\n'
+    
+    yield json.dumps({
+        'summary': {
+            'total': len(images),
+            'successful': successful,
+            'failed': len(images) - successful
+        }
+    }) + '\n'
+
 @app.route('/assess-food', methods=['POST'])
 def assess_food_quality():
     """Enhanced food quality assessment endpoint"""
     try:
         data = request.get_json()
-        if not data or 'image' not in data:
+        if not data or ('image' not in data and 'images' not in data):
             return jsonify({
                 'success': False, 
                 'error': 'No image provided. Please include base64 encoded image data.'
@@ -571,21 +1796,36 @@ def assess_food_quality():
         print(f"Received assessment request at {datetime.now()}")
         
         # Process single image or batch
-        images = data.get('images', [data['image']])
+        images = data.get('images') or [data.get('image')]
+        try:
+            fields = requested_fields(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if wants_ndjson(data):
+            return Response(
+                stream_with_context(stream_assessments(images, fields, data.get('reference'))),
+                mimetype='application/x-ndjson',
+                headers={'X-Accel-Buffering': 'no'}
+            )
+        
+        use_msgpack = wants_msgpack(data)
+        if use_msgpack and msgpack is None:
+            return jsonify({
+                'success': False,
+                'error': 'MessagePack responses are not available on this server (msgpack not installed).'
+            }), 406
+        
         results = []
         
         for i, image in enumerate(images):
             print(f"Processing image {i+1}/{len(images)}")
             
-            if not image or len(image) < 100:  # Basic validation
-                results.append({'error': 'Invalid image data provided'})
-                continue
-                
-            result = food_ai.assess_food_quality(image)
+            result = assess_single_image(image, fields, data.get('reference'))
             
             if 'error' in result:
                 if len(images) == 1:  # Single image - return error immediately
-                    return jsonify({'success': False, 'error': result['error']}), 400
+                    return encode_response({'success': False, 'error': result['error']}, 400, use_msgpack)
                 else:  # Batch - include error in results
                     results.append(result)
             else:
@@ -594,12 +1834,12 @@ def assess_food_quality():
         # Return appropriate response format
         if len(results) == 1:
             if 'error' in results[0]:
-                return jsonify({'success': False, 'error': results[0]['error']}), 400
-            return jsonify({'success': True, 'data': results[0]})
+                return encode_response({'success': False, 'error': results[0]['error']}, 400, use_msgpack)
+            return encode_response({'success': True, 'data': results[0]}, use_msgpack=use_msgpack)
         else:
             # Batch results
             successful_results = [r for r in results if 'error' not in r]
-            return jsonify({
+            return encode_response({
                 'success': True, 
                 'data': results,
                 'summary': {
@@ -607,7 +1847,7 @@ def assess_food_quality():
                     'successful': len(successful_results),
                     'failed': len(results) - len(successful_results)
                 }
-            })
+            }, use_msgpack=use_msgpack)
             
     except Exception as e:
         print(f"Assessment endpoint error: {str(e)}")
@@ -616,6 +1856,96 @@ def assess_food_quality():
             'error': f'Server error during assessment: {str(e)}'
         }), 500
 
+@app.route('/assess-food/raw', methods=['POST'])
+def assess_food_raw():
+    """Low-overhead assessment: the request body is the image file itself (no base64/JSON)"""
+    try:
+        image_bytes = request.get_data()
+        fields = requested_fields({})
+        use_msgpack = wants_msgpack({'format': request.args.get('format')})
+        if use_msgpack and msgpack is None:
+            return jsonify({
+                'success': False,
+                'error': 'MessagePack responses are not available on this server (msgpack not installed).'
+            }), 406
+        
+        result = assess_single_image(image_bytes, fields, request.args.get('reference'))
+        if 'error' in result:
+            return encode_response({'success': False, 'error': result['error']}, 400, use_msgpack)
+        return encode_response({'success': True, 'data': result}, use_msgpack=use_msgpack)
+        
+    except Exception as e:
+        print(f"Raw assessment endpoint error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Server error during assessment: {str(e)}'
+        }), 500
+
+@app.route('/similar', methods=['POST'])
+def find_similar_food():
+    """Nearest previously assessed images, for moderation and duplicate listings"""
+    try:
+        if food_ai.embedding_index is None:
+            return jsonify({'success': False, 'error': 'Similar-food index is disabled'}), 503
+        
+        data = request.get_json() or {}
+        if not data.get('image') and not data.get('image_hash'):
+            return jsonify({
+                'success': False,
+                'error': 'Provide an image (base64) or the image_hash of an assessed image.'
+            }), 400
+        
+        try:
+            k = max(1, min(50, int(data.get('k', 5))))
+            min_similarity = float(data.get('min_similarity', 0.0))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'k must be an integer and min_similarity a number.'}), 400
+        
+        try:
+            matches = food_ai.find_similar(data.get('image'), data.get('image_hash'), k)
+        except LookupError as e:
+            return jsonify({'success': False, 'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'data': [match for match in matches if match['similarity'] >= min_similarity],
+            'index': food_ai.embedding_index.stats()
+        })
+        
+    except Exception as e:
+        print(f"Similar endpoint error: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': f'Server error during similarity search: {str(e)}'
+        }), 500
+
+frame_stream_slots = threading.BoundedSemaphore(MAX_FRAME_STREAMS)
+
+if sock:
+    @sock.route('/stream-frames')
+    def stream_frames(ws):
+        """Live camera scanning over WebSocket: one message in per frame, one message out"""
+        if not verify_stream_ticket(request.args.get('ticket')):
+            ws.close(reason=1008, message='Invalid or expired stream ticket')
+            return
+        if not frame_stream_slots.acquire(blocking=False):
+            ws.close(reason=1013, message='Too many live scans, try again later')
+            return
+        
+        stream = FrameStream(food_ai)
+        print(f"Frame stream opened at {datetime.now()}")
+        try:
+            while True:
+                frame = ws.receive()
+                if frame is None:
+                    break
+                ws.send(json.dumps(stream.process(frame)))
+        finally:
+            frame_stream_slots.release()
+            print(f"Frame stream closed: {stream.assessed}/{stream.frames} frames assessed")
+
 @app.route('/models/status', methods=['GET'])
 def get_model_status():
     """Enhanced model status check with detailed information"""
@@ -660,9 +1990,18 @@ def get_model_status():
             'total_models': total_models,
             'ready_models': ready_models,
             'ensemble_ready': ready_models > 0,
+            'cascade': {
+                'enabled': CASCADE_ENABLED,
+                'primary_model': CASCADE_PRIMARY_MODEL,
+                'uncertain_band': [CASCADE_LOW, CASCADE_HIGH]
+            },
             'freshness_classifier': classifier_status,
             'food_keywords_count': len(food_ai.food_keywords),
-            'food_categories_count': len(food_ai.food_freshness_map)
+            'food_categories_count': len(food_ai.food_freshness_map),
+            'assessment_store': food_ai.store.stats() if food_ai.store else None,
+            'embedding_index': food_ai.embedding_index.stats() if food_ai.embedding_index else None,
+            'image_rejections': image_rejection_counts(),
+            'buffer_pools': buffer_pools.stats()
         },
         'timestamp': datetime.now().isoformat()
     })
@@ -685,7 +2024,10 @@ def health_check():
                 'Texture quality assessment',
                 'Smart food detection',
                 'Batch processing support'
-            ],
+            ] + (['Live frame streaming'] if sock else []),
+            'image_rejections': image_rejection_counts(),
+            'buffer_pools': buffer_pools.stats(),
+            'startup': startup_timeline(),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -695,6 +2037,60 @@ def health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+def admin_authorized():
+    """Admin endpoints require X-Admin-Token to match FOODCV_ADMIN_TOKEN (and are off without it)"""
+    token = request.headers.get('X-Admin-Token')
+    return ADMIN_TOKEN is not None and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+@app.route('/profiler', methods=['GET', 'POST', 'DELETE'])
+def assessment_profile():
+    """Start (POST), stop (DELETE) or read (GET) an assessment profiling window.
+
+    GET returns the status as JSON, or the aggregated profile with
+    ?format=text (pstats table), pstats (marshalled stats) or collapsed
+    (flame graph stacks, pruned below ?min_us=1000).
+    """
+    if ADMIN_TOKEN is None:
+        return jsonify({'success': False, 'error': 'Profiler is disabled (FOODCV_ADMIN_TOKEN is not set)'}), 403
+    if not admin_authorized():
+        return jsonify({'success': False, 'error': 'Admin token required'}), 403
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            duration = float(data.get('duration', 60))
+            sample_rate = float(data.get('sample_rate', 0.1))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'duration and sample_rate must be numbers'}), 400
+        if not 0 < duration <= PROFILER_MAX_SECONDS or not 0 < sample_rate <= 1:
+            return jsonify({
+                'success': False,
+                'error': f'duration must be in (0, {PROFILER_MAX_SECONDS}] seconds and sample_rate in (0, 1]'
+            }), 400
+        assessment_profiler.start(duration, sample_rate)
+    elif request.method == 'DELETE':
+        assessment_profiler.stop()
+    
+    output = request.args.get('format') if request.method == 'GET' else None
+    if output == 'text':
+        sort = request.args.get('sort', 'cumulative')
+        limit = request.args.get('limit', 40, type=int)
+        try:
+            return Response(assessment_profiler.report(sort, limit), mimetype='text/plain')
+        except KeyError:
+            return jsonify({'success': False, 'error': f'Unknown sort key: {sort}'}), 400
+    if output == 'pstats':
+        return Response(
+            assessment_profiler.dump(),
+            mimetype='application/octet-stream',
+            headers={'Content-Disposition': 'attachment; filename=assess_food_quality.pstats'}
+        )
+    if output == 'collapsed':
+        min_us = request.args.get('min_us', 1000, type=float)
+        return Response(assessment_profiler.collapsed(max(0.0, min_us)), mimetype='text/plain')
+    
+    return jsonify({'success': True, 'profiler': assessment_profiler.status()})
+
 @app.route('/test-prediction', methods=['POST'])
 def test_prediction():
     """Test endpoint for quick model validation"""
@@ -724,5 +2120,34 @@ def test_prediction():
             'error': f'Model test failed: {str(e)}'
         }), 500
 
+def create_unix_server(path):
+    """Threaded server bound to a Unix domain socket (a stale socket file is replaced)"""
+    server = make_server(f'unix://{path}', 0, app, threaded=True)
+    print(f"Service listening on unix socket: {path}")
+    return server
+
+# Every route is registered; report the timeline here so gunicorn workers print it too
+record_startup_phase('routes')
+print("Startup timeline: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in STARTUP_PHASES)
+      + f" (total {startup_timeline()['total_seconds']:.2f}s)")
+
+def run_server():
+    """Start the development server on TCP, a Unix socket, or both.
+
+    Werkzeug closes every connection after one response; serve with
+    gunicorn -c gunicorn.conf.py foodCV:app for keep-alive connections.
+    """
+    if SERVICE_UNIX_SOCKET and not SERVICE_TCP_ENABLED:
+        create_unix_server(SERVICE_UNIX_SOCKET).serve_forever()
+        return
+    
+    # With the debug reloader, only the reloaded child process binds the socket
+    reloader_child = os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    if SERVICE_UNIX_SOCKET and (not SERVICE_DEBUG or reloader_child):
+        unix_server = create_unix_server(SERVICE_UNIX_SOCKET)
+        threading.Thread(target=unix_server.serve_forever, name='unix-socket', daemon=True).start()
+    
+    app.run(host=SERVICE_HOST, port=SERVICE_PORT, debug=SERVICE_DEBUG, threaded=True)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
+    run_server()
\ No newline at end of file
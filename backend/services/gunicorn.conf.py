@@ -0,0 +1,30 @@
+"""Gunicorn settings for the AI service.
+
+Run from backend/services with: gunicorn -c gunicorn.conf.py foodCV:app
+Binds the same TCP address and Unix socket as `python foodCV.py` (FOODCV_HOST,
+FOODCV_PORT, FOODCV_TCP, FOODCV_UNIX_SOCKET) and keeps client connections open
+between requests.
+"""
+import os
+
+# Serve without the debug reloader and prewarm the models unless told otherwise
+os.environ.setdefault('FOODCV_DEBUG', '0')
+os.environ.setdefault('FOODCV_PREWARM', '1')
+
+bind = []
+if os.environ.get('FOODCV_TCP', '1') != '0':
+    bind.append(f"{os.environ.get('FOODCV_HOST', '0.0.0.0')}:{os.environ.get('FOODCV_PORT', '5001')}")
+if os.environ.get('FOODCV_UNIX_SOCKET'):
+    bind.append(f"unix:{os.environ['FOODCV_UNIX_SOCKET']}")
+
+# A single process holds the models; requests and frame streams run on its threads.
+# Live scans hold a thread each, so they get FOODCV_MAX_STREAMS threads of their own
+workers = 1
+worker_class = 'gthread'
+threads = int(os.environ.get('FOODCV_THREADS', '8')) + int(os.environ.get('FOODCV_MAX_STREAMS', '4'))
+
+# Idle connections stay open longer than the Node agent's socket timeout (60 s)
+keepalive = 75
+
+# The worker loads (and prewarms) the models before it first reports in
+timeout = 300
@@ -1,7 +1,11 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { foodAPI } from '../../services/api';
 
-const FoodQualityScanner = ({ onAssessmentComplete, className = "" }) => {
+const AI_STREAM_URL = process.env.REACT_APP_AI_STREAM_URL || 'ws://localhost:5001/stream-frames';
+const LIVE_FRAME_INTERVAL = 400; // ms between frame captures
+const LIVE_FRAME_WIDTH = 320; // frames are downscaled before sending
+
+const FoodQualityScanner = ({ onAssessmentComplete, foodId, className = "" }) => {
   const videoRef = useRef(null);
   const canvasRef = useRef(null);
   const [isScanning, setIsScanning] = useState(false);
@@ -10,9 +14,19 @@ const FoodQualityScanner = ({ onAssessmentComplete, className = "" }) => {
   const [cameraActive, setCameraActive] = useState(false);
   const [error, setError] = useState('');
   const [capturedImage, setCapturedImage] = useState(null);
+  const [liveActive, setLiveActive] = useState(false);
+  const [liveAssessment, setLiveAssessment] = useState(null);
+  const [liveStats, setLiveStats] = useState({ frames: 0, assessed: 0 });
+  const wsRef = useRef(null);
+  const liveTimerRef = useRef(null);
+  const framePendingRef = useRef(false);
+  const liveResultRef = useRef(null);
 
   useEffect(() => {
-    return () => stopCamera();
+    return () => {
+      stopLiveScan();
+      stopCamera();
+    };
   }, []);
 
   const startCamera = async () => {
@@ -45,6 +59,7 @@ const FoodQualityScanner = ({ onAssessmentComplete, className = "" }) => {
   const capturePhoto = () => {
     if (!videoRef.current || !canvasRef.current) return;
 
+    stopLiveScan();
     const canvas = canvasRef.current;
     const video = videoRef.current;
     
@@ -59,12 +74,125 @@ const FoodQualityScanner = ({ onAssessmentComplete, className = "" }) => {
     stopCamera();
   };
 
+  const sendLiveFrame = () => {
+    const ws = wsRef.current;
+    const video = videoRef.current;
+    const canvas = canvasRef.current;
+    if (!ws || ws.readyState !== WebSocket.OPEN || !video || !canvas || !video.videoWidth) return;
+    // Wait for the previous frame's reply so frames never queue up behind inference
+    if (framePendingRef.current) return;
+
+    const scale = Math.min(1, LIVE_FRAME_WIDTH / video.videoWidth);
+    canvas.width = Math.round(video.videoWidth * scale);
+    canvas.height = Math.round(video.videoHeight * scale);
+    canvas.getContext('2d').drawImage(video, 0, 0, canvas.width, canvas.height);
+
+    framePendingRef.current = true;
+    canvas.toBlob((blob) => {
+      if (blob && ws.readyState === WebSocket.OPEN) {
+        ws.send(blob);
+      } else {
+        framePendingRef.current = false;
+      }
+    }, 'image/jpeg', 0.7);
+  };
+
+  const startLiveScan = async () => {
+    setError('');
+    setLiveAssessment(null);
+    setLiveStats({ frames: 0, assessed: 0 });
+    liveResultRef.current = null;
+
+    // The AI service only accepts streams opened with a ticket from the backend
+    let ticket;
+    try {
+      ({ ticket } = await foodAPI.getAIStreamTicket());
+    } catch (err) {
+      setError(err.error || err.message || 'Live scanning is unavailable. Please capture a photo instead.');
+      return;
+    }
+
+    const ws = new WebSocket(`${AI_STREAM_URL}?ticket=${encodeURIComponent(ticket)}`);
+    ws.binaryType = 'arraybuffer';
+
+    ws.onopen = () => {
+      setLiveActive(true);
+      framePendingRef.current = false;
+      liveTimerRef.current = setInterval(sendLiveFrame, LIVE_FRAME_INTERVAL);
+    };
+
+    ws.onmessage = (event) => {
+      framePendingRef.current = false;
+      const message = JSON.parse(event.data);
+      setLiveStats((stats) => ({
+        frames: message.frame || stats.frames,
+        assessed: message.frames_assessed || stats.assessed
+      }));
+
+      if (message.type === 'assessment') {
+        liveResultRef.current = { ...message.latest, ...message.data };
+        setLiveAssessment(message.data);
+        setError('');
+      } else if (message.type === 'error') {
+        setError(message.error);
+      }
+    };
+
+    ws.onerror = () => {
+      setError('Live scanning is unavailable. Please capture a photo instead.');
+    };
+
+    ws.onclose = (event) => {
+      clearInterval(liveTimerRef.current);
+      liveTimerRef.current = null;
+      setLiveActive(false);
+      if (event.code === 1008) {
+        setError('Live scan was refused. Please try again.');
+      } else if (event.code === 1013) {
+        setError('Live scanning is busy right now. Please try again shortly or capture a photo.');
+      }
+    };
+
+    wsRef.current = ws;
+  };
+
+  const stopLiveScan = () => {
+    clearInterval(liveTimerRef.current);
+    liveTimerRef.current = null;
+    if (wsRef.current) {
+      wsRef.current.close();
+      wsRef.current = null;
+    }
+    setLiveActive(false);
+  };
+
+  const applyLiveResult = () => {
+    if (!liveResultRef.current) return;
+
+    let imageData = null;
+    if (videoRef.current && canvasRef.current) {
+      const canvas = canvasRef.current;
+      canvas.width = videoRef.current.videoWidth;
+      canvas.height = videoRef.current.videoHeight;
+      canvas.getContext('2d').drawImage(videoRef.current, 0, 0);
+      imageData = canvas.toDataURL('image/jpeg', 0.8);
+    }
+
+    const assessmentWithImage = { ...liveResultRef.current, captured_image: imageData };
+    stopLiveScan();
+    stopCamera();
+    setIsScanning(false);
+    setCapturedImage(imageData);
+    setAssessment(assessmentWithImage);
+    onAssessmentComplete(assessmentWithImage);
+  };
+
   const analyzeImage = async (imageData) => {
     setLoading(true);
     setError('');
 
     try {
-      const response = await foodAPI.assessFoodQuality({ image: imageData });
+      const response = await foodAPI.assessFoodQuality({ image: imageData, foodId });
       
       if (response.success) {
         // Add captured image to assessment data
@@ -100,6 +228,8 @@ const FoodQualityScanner = ({ onAssessmentComplete, className = "" }) => {
   };
 
   const resetScanner = () => {
+    stopLiveScan();
+    setLiveAssessment(null);
     setAssessment(null);
     setCapturedImage(null);
     setIsScanning(false);
@@ -172,6 +302,45 @@ const FoodQualityScanner = ({ onAssessmentComplete, className = "" }) => {
                 <div className="absolute bottom-4 right-4 w-8 h-8 border-r-4 border-b-4 border-green-400"></div>
               </div>
             )}
+
+            {liveActive && (
+              <div className="absolute bottom-0 inset-x-0 bg-black bg-opacity-60 text-white px-4 py-3">
+                {liveAssessment ? (
+                  <div className="flex items-center justify-between">
+                    <div>
+                      <div className="font-bold">{liveAssessment.food_type} • {liveAssessment.quality_grade}</div>
+                      <div className="text-xs">
+                        Freshness {liveAssessment.freshness_score}% • {liveAssessment.shelf_life_days} days
+                      </div>
+                    </div>
+                    <div className="text-xs text-right">
+                      {liveStats.assessed}/{liveStats.frames} frames analyzed
+                    </div>
+                  </div>
+                ) : (
+                  <div className="text-sm">Point the camera at your food...</div>
+                )}
+              </div>
+            )}
+          </div>
+
+          <div className="flex gap-3">
+            <button
+              onClick={liveActive ? stopLiveScan : startLiveScan}
+              disabled={!cameraActive}
+              className="flex-1 bg-gradient-to-r from-purple-500 to-pink-500 text-white px-6 py-3 rounded-lg font-semibold hover:from-purple-600 hover:to-pink-600 disabled:opacity-50 disabled:cursor-not-allowed transition-all duration-300 shadow-lg"
+            >
+              {liveActive ? '⏹ Stop Live Scan' : '🎥 Live Scan'}
+            </button>
+
+            {liveAssessment && (
+              <button
+                onClick={applyLiveResult}
+                className="flex-1 bg-gradient-to-r from-green-500 to-blue-500 text-white px-6 py-3 rounded-lg font-semibold hover:from-green-600 hover:to-blue-600 transition-all duration-300 shadow-lg"
+              >
+                ✅ Use Result
+              </button>
+            )}
           </div>
 
           <div className="flex gap-3">
@@ -185,6 +354,7 @@ const FoodQualityScanner = ({ onAssessmentComplete, className = "" }) => {
             
             <button
               onClick={() => {
+                stopLiveScan();
                 setIsScanning(false);
                 stopCamera();
               }}
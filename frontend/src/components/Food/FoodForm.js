@@ -287,6 +287,7 @@ const FoodForm = () => {
 
           <div className="mb-6">
             <FoodQualityScanner 
+              foodId={id}
               onAssessmentComplete={(result) => {
                 setAiAssessment(result);
                 
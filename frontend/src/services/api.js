@@ -187,6 +187,26 @@ export const foodAPI = {
     }
   },
 
+  // Find previously assessed food images similar to an image (Volunteer/Admin)
+  findSimilarFoods: async (data) => {
+    try {
+      const response = await axiosInstance.post('/food/ai-similar', data);
+      return response.data;
+    } catch (error) {
+      throw error.response?.data || error;
+    }
+  },
+
+  // Get a short-lived ticket for the live frame stream
+  getAIStreamTicket: async () => {
+    try {
+      const response = await axiosInstance.get('/food/ai-stream-ticket');
+      return response.data;
+    } catch (error) {
+      throw error.response?.data || error;
+    }
+  },
+
   // Get AI models status (Admin only)
   getAIModelsStatus: async () => {
     try {
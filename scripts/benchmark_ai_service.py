@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Benchmark the food quality assessment pipeline.
+
+In-process mode reports per-request latency together with allocation figures:
+pool buffer allocations, peak transient memory and gen-0 GC collections.
+
+HTTP mode load-tests a running service over TCP and/or its Unix domain socket,
+reporting connection setup, per-request transport latency and the server's own
+buffer pool allocations (read from /health).
+"""
+import argparse
+import base64
+import gc
+import http.client
+import io
+import json
+import socket
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+from PIL import Image
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent / "backend" / "services"
+
+def create_test_image(seed, size=(640, 480)):
+    """Create a noisy reddish JPEG so every request decodes a distinct payload"""
+    rng = np.random.default_rng(seed)
+    img = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    img[:, :] = [220, 90, 80]
+    img = np.clip(img + rng.integers(-30, 30, img.shape), 0, 255).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    Image.fromarray(img).save(buffer, format='JPEG', quality=85)
+    return f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+def percentile(values, pct):
+    return float(np.percentile(values, pct)) if values else 0.0
+
+def run_benchmark(food_ai, buffer_pools, images, warmup):
+    """Run the pipeline over the images and collect per-request measurements"""
+    for image in images[:warmup]:
+        food_ai.assess_food_quality(image)
+
+    latencies = []
+    pool_allocs = []
+    peaks = []
+    gc_gen0 = []
+
+    tracemalloc.start()
+    for image in images[warmup:]:
+        allocs_before = buffer_pools.stats()['allocations']
+        gen0_before = gc.get_stats()[0]['collections']
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+
+        start = time.perf_counter()
+        food_ai.assess_food_quality(image)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append((peak - baseline) / 1024)
+        pool_allocs.append(buffer_pools.stats()['allocations'] - allocs_before)
+        gc_gen0.append(gc.get_stats()[0]['collections'] - gen0_before)
+    tracemalloc.stop()
+
+    return {
+        'requests': len(latencies),
+        'latency_p50_ms': percentile(latencies, 50),
+        'latency_p95_ms': percentile(latencies, 95),
+        'pool_allocs_per_req': float(np.mean(pool_allocs)) if pool_allocs else 0.0,
+        'peak_kib_per_req': float(np.mean(peaks)) if peaks else 0.0,
+        'gc_gen0_per_req': float(np.mean(gc_gen0)) if gc_gen0 else 0.0,
+        'pool_buffers_total': buffer_pools.stats()['allocations']
+    }
+
+def print_report(stats):
+    print("-" * 60)
+    print(f"Requests measured:        {stats['requests']}")
+    print(f"Latency p50 / p95 (ms):   {stats['latency_p50_ms']:.1f} / {stats['latency_p95_ms']:.1f}")
+    print(f"Pool allocations/request: {stats['pool_allocs_per_req']:.2f}")
+    print(f"Peak transient KiB/req:   {stats['peak_kib_per_req']:.1f}")
+    print(f"Gen-0 GC runs/request:    {stats['gc_gen0_per_req']:.2f}")
+    print(f"Pool buffers (lifetime):  {stats['pool_buffers_total']}")
+    print("-" * 60)
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket"""
+
+    def __init__(self, socket_path, timeout=60):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def build_request(image, request_format):
+    """Request path, body and headers for the JSON (base64) or raw-bytes format"""
+    if request_format == 'raw':
+        encoded = image.split(',')[1]
+        return '/assess-food/raw', base64.b64decode(encoded), {'Content-Type': 'application/octet-stream'}
+    return '/assess-food', json.dumps({'image': image}).encode(), {'Content-Type': 'application/json'}
+
+def server_pool_stats(connect):
+    """The service's buffer pool counters from /health (None if it does not report them)"""
+    conn = connect()
+    try:
+        conn.request('GET', '/health')
+        return json.loads(conn.getresponse().read()).get('buffer_pools')
+    finally:
+        conn.close()
+
+def run_http_benchmark(connect, images, warmup, request_format, keep_alive):
+    """Send the images to a running service and time connection setup and requests"""
+    connect_times = []
+    latencies = []
+    bytes_sent = []
+    failures = 0
+    server_closes = 0
+    conn = None
+    pools_before = server_pool_stats(connect) if warmup == 0 else None
+
+    for i, image in enumerate(images):
+        path, body, headers = build_request(image, request_format)
+        if not keep_alive:
+            headers['Connection'] = 'close'
+
+        start = time.perf_counter()
+        if conn is None:
+            conn = connect()
+            conn.connect()
+            connected = time.perf_counter()
+            if i >= warmup:
+                connect_times.append((connected - start) * 1000)
+
+        conn.request('POST', path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        elapsed = (time.perf_counter() - start) * 1000
+
+        if response.status != 200:
+            failures += 1
+        if i == warmup - 1:
+            pools_before = server_pool_stats(connect)
+        if i >= warmup:
+            latencies.append(elapsed)
+            bytes_sent.append(len(body))
+
+        if keep_alive and response.will_close:
+            server_closes += 1
+        if not keep_alive or response.will_close:
+            conn.close()
+            conn = None
+
+    if conn is not None:
+        conn.close()
+
+    pools_after = server_pool_stats(connect)
+    pool_allocs = None
+    if pools_before and pools_after and latencies:
+        pool_allocs = (pools_after['allocations'] - pools_before['allocations']) / len(latencies)
+
+    return {
+        'requests': len(latencies),
+        'failures': failures,
+        'connections': len(connect_times),
+        'server_closes': server_closes,
+        'connect_avg_ms': float(np.mean(connect_times)) if connect_times else 0.0,
+        'latency_p50_ms': percentile(latencies, 50),
+        'latency_p95_ms': percentile(latencies, 95),
+        'request_kib': float(np.mean(bytes_sent)) / 1024 if bytes_sent else 0.0,
+        'pool_allocs_per_req': pool_allocs,
+        'server_pools': pools_after['pools'] if pools_after else None
+    }
+
+def print_http_report(name, stats):
+    print("-" * 60)
+    print(f"Transport:                {name}")
+    print(f"Requests / failures:      {stats['requests']} / {stats['failures']}")
+    print(f"Connections opened:       {stats['connections']} (avg setup {stats['connect_avg_ms']:.3f} ms)")
+    print(f"Latency p50 / p95 (ms):   {stats['latency_p50_ms']:.1f} / {stats['latency_p95_ms']:.1f}")
+    print(f"Request body KiB:         {stats['request_kib']:.1f}")
+    if stats['pool_allocs_per_req'] is not None:
+        print(f"Server pool allocs/req:   {stats['pool_allocs_per_req']:.2f} ({stats['server_pools']} pools)")
+    if stats['server_closes']:
+        print(f"WARNING: the server closed {stats['server_closes']} keep-alive connections "
+              "(Werkzeug's development server does not keep connections open; serve with gunicorn)")
+
+def http_transports(args):
+    """(name, connection factory) for each transport selected on the command line"""
+    transports = []
+    if args.url:
+        parsed = urlparse(args.url)
+        transports.append((
+            f"tcp {parsed.hostname}:{parsed.port or 80}",
+            lambda: http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+        ))
+    if args.unix_socket:
+        transports.append((
+            f"unix {args.unix_socket}",
+            lambda: UnixHTTPConnection(args.unix_socket)
+        ))
+    return transports
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FoodShare AI assessment pipeline")
+    parser.add_argument('--requests', type=int, default=20, help="measured requests")
+    parser.add_argument('--warmup', type=int, default=3, help="unmeasured warm-up requests")
+    parser.add_argument('--http', action='store_true', help="load-test a running service instead of running in-process")
+    parser.add_argument('--url', default='http://localhost:5001', help="TCP base URL (empty to skip TCP)")
+    parser.add_argument('--unix-socket', help="also test the service's Unix domain socket at this path")
+    parser.add_argument('--format', choices=['json', 'raw'], default='json', help="base64 JSON body or raw image bytes")
+    parser.add_argument('--no-keep-alive', action='store_true', help="open a new connection for every request")
+    args = parser.parse_args()
+
+    print("Generating test images...")
+    images = [create_test_image(i) for i in range(args.warmup + args.requests)]
+
+    if args.http:
+        keep_alive = not args.no_keep_alive
+        print(f"Load-testing {args.requests} requests ({args.warmup} warm-up), "
+              f"format={args.format}, keep-alive={'on' if keep_alive else 'off'}...")
+        for name, connect in http_transports(args):
+            stats = run_http_benchmark(connect, images, args.warmup, args.format, keep_alive)
+            print_http_report(name, stats)
+        print("-" * 60)
+        return
+
+    sys.path.insert(0, str(SERVICE_DIR))
+    from foodCV import food_ai, buffer_pools
+
+    print(f"Running {args.requests} requests ({args.warmup} warm-up)...")
+    stats = run_benchmark(food_ai, buffer_pools, images, args.warmup)
+    print_report(stats)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,46 @@
 #!/usr/bin/env python3
+import argparse
+import importlib.util
+import platform
+import re
 import subprocess
 import sys
 import os
 import time
+from importlib import metadata
 from pathlib import Path
+try:
+    from packaging.requirements import Requirement
+except ImportError:
+    try:
+        from pip._vendor.packaging.requirements import Requirement
+    except ImportError:  # Fall back to the simple name/version parser below
+        Requirement = None
+
+REQUIREMENTS_PATH = Path("backend/requirements.txt")
+
+# Drop-in builds that provide the same import package as the listed distribution
+ALTERNATIVE_DISTRIBUTIONS = {
+    'tensorflow': ['tensorflow-cpu', 'tensorflow-macos', 'tensorflow-intel'],
+    'opencv-python': ['opencv-python-headless', 'opencv-contrib-python', 'opencv-contrib-python-headless']
+}
+
+class StartupTimeline:
+    """Wall-clock duration of each launcher phase"""
+
+    def __init__(self):
+        self.phases = []
+        self.mark = time.perf_counter()
+
+    def record(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.mark))
+        self.mark = now
+
+    def report(self):
+        total = sum(seconds for _, seconds in self.phases)
+        print("Launcher timeline: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases)
+              + f" (total {total:.2f}s)")
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -12,19 +49,56 @@ def check_python_version():
         sys.exit(1)
     print(f"Python version: {sys.version}")
 
-def install_requirements():
+def version_tuple(version):
+    """Numeric release segments of a version string, e.g. '2.16.1rc0' -> (2, 16, 1)"""
+    return tuple(int(part) for part in re.findall(r"\d+", version.split("+")[0].split("rc")[0])[:4])
+
+def installed_version(name):
+    """Installed version of a distribution or one of its drop-in alternatives, or None"""
+    for candidate in [name] + ALTERNATIVE_DISTRIBUTIONS.get(name.lower(), []):
+        try:
+            return metadata.version(candidate)
+        except metadata.PackageNotFoundError:
+            continue
+    return None
+
+def requirement_satisfied(line):
+    """Whether an installed distribution satisfies one requirements.txt line"""
+    if Requirement is not None:
+        requirement = Requirement(line)
+        if requirement.marker is not None and not requirement.marker.evaluate():
+            return True
+        installed = installed_version(requirement.name)
+        return installed is not None and requirement.specifier.contains(installed, prereleases=True)
+    
+    # Environment markers (after ';') are not evaluated here
+    match = re.match(r"^([A-Za-z0-9_.\-]+)(?:\[[^\]]*\])?\s*(?:(>=|==|>|<=|<|!=)\s*([\w.]+))?", line)
+    name, operator, wanted = match.groups()
+    installed = installed_version(name)
+    if installed is None:
+        return False
+    if operator is None:
+        return True
+    installed, wanted = version_tuple(installed), version_tuple(wanted)
+    return {
+        ">=": installed >= wanted, "==": installed == wanted, ">": installed > wanted,
+        "<=": installed <= wanted, "<": installed < wanted, "!=": installed != wanted
+    }[operator]
+
+def missing_requirements(requirements_path):
+    """Requirement lines not satisfied by the installed distributions"""
+    missing = []
+    for line in requirements_path.read_text().splitlines():
+        line = line.split("#")[0].strip()
+        if line and not line.startswith("-") and not requirement_satisfied(line):
+            missing.append(line)
+    return missing
+
+def install_requirements(requirements_path=REQUIREMENTS_PATH):
     """Install Python dependencies with better error handling"""
     print("Installing Python dependencies...")
-    requirements_path = Path("backend/requirements.txt")
-    
-    if not requirements_path.exists():
-        print(f"Error: {requirements_path} not found")
-        sys.exit(1)
     
     try:
-        # Upgrade pip first
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "--upgrade", "pip"])
-        
         # Install requirements
         subprocess.check_call([
             sys.executable, "-m", "pip", "install", "-r", str(requirements_path),
@@ -54,7 +128,27 @@ def check_service_file():
         sys.exit(1)
     return service_path
 
-def start_service():
+def ensure_requirements(force_install=False):
+    """Install dependencies only when some requirement is missing or outdated"""
+    if not REQUIREMENTS_PATH.exists():
+        print(f"Error: {REQUIREMENTS_PATH} not found")
+        sys.exit(1)
+    
+    missing = REQUIREMENTS_PATH.read_text().splitlines() if force_install else missing_requirements(REQUIREMENTS_PATH)
+    if not missing:
+        print("All Python dependencies satisfied, skipping installation")
+        return False
+    
+    if not force_install:
+        print(f"Missing or outdated: {', '.join(missing)}")
+    install_requirements()
+    return True
+
+def gunicorn_available():
+    """Whether the service can be served by gunicorn (not available on Windows)"""
+    return platform.system() != 'Windows' and importlib.util.find_spec('gunicorn') is not None
+
+def start_service(dev=False):
     """Start the AI service with proper error handling"""
     print("Starting Enhanced AI Food Quality Assessment Service...")
     print("Features: Multi-model ensemble, Advanced freshness analysis, Smart detection")
@@ -62,17 +156,32 @@ def start_service():
     
     service_path = check_service_file()
     
+    # Gunicorn keeps connections alive and prewarms the models before the first
+    # request; --dev (or a platform without gunicorn) uses the Werkzeug dev server
+    use_gunicorn = not dev and gunicorn_available()
+    env = dict(os.environ)
+    env.setdefault('FOODCV_DEBUG', '1' if dev else '0')
+    env.setdefault('FOODCV_PREWARM', '0' if dev else '1')
+    if use_gunicorn:
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "foodCV:app"]
+        server = "gunicorn"
+    else:
+        command = [sys.executable, "foodCV.py"]
+        server = "Werkzeug development server" + ("" if dev else ", gunicorn not available")
+    
     try:
         # Change to service directory
         os.chdir('backend/services')
         
         # Start the service
-        print(f"Starting service at: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        print("Service will be available at: http://localhost:5001")
+        print(f"Starting service at: {time.strftime('%Y-%m-%d %H:%M:%S')} ({server})")
+        print(f"Service will be available at: http://localhost:{env.get('FOODCV_PORT', '5001')}")
         print("Press Ctrl+C to stop the service")
         print("-" * 60)
         
-        subprocess.run([sys.executable, "foodCV.py"])
+        # The service reports the rest of the startup timeline (imports, models, prewarm)
+        env['FOODCV_LAUNCHED_AT'] = str(time.time())
+        subprocess.run(command, env=env)
         
     except FileNotFoundError:
         print("Error: Could not find the service directory")
@@ -83,22 +192,27 @@ def start_service():
 
 def main():
     """Main function with comprehensive setup"""
+    parser = argparse.ArgumentParser(description="Start the FoodShare AI service")
+    parser.add_argument('--install', action='store_true', help="reinstall requirements even if satisfied")
+    parser.add_argument('--dev', action='store_true', help="run the development server with the debug reloader and without prewarming")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("Enhanced FoodShare AI Service Startup")
     print("=" * 60)
     
+    timeline = StartupTimeline()
     try:
         # Check Python version
         check_python_version()
         
-        # Install dependencies
-        install_requirements()
-        
-        # Wait a moment for installations to complete
-        time.sleep(2)
+        # Install dependencies only when needed
+        installed = ensure_requirements(force_install=args.install)
+        timeline.record('install' if installed else 'dependency_check')
+        timeline.report()
         
         # Start the service
-        start_service()
+        start_service(dev=args.dev)
         
     except KeyboardInterrupt:
         print("\n" + "=" * 60)